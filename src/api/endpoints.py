@@ -1,15 +1,82 @@
+import hashlib
+import hmac
+import itertools
 import json
 import logging
 import os
-from typing import Dict, List, Any, Optional
+import orjson
+import queue
+import threading
+import time
+import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Any, Optional
 from datetime import datetime
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, Response, stream_with_context
 from flask_cors import CORS
 from src.api.setup_api import logger
 from src.core.qa_chain import QAChain
+from src.core.clause_extractor import EvidenceMapper
 from src.utils.cache_manager import CacheManager
 from src.utils.security_manager import SecurityManager
 
+# Pending webhook deliveries beyond this are dropped (and logged) rather than queued without bound
+_WEBHOOK_QUEUE_SIZE = 10000
+_WEBHOOK_WORKERS = 8
+_WEBHOOK_TIMEOUT = (3, 7)  # (connect, read) seconds
+
+# Gradio writes this file; it is re-read only when its mtime changes
+_WEBHOOK_CONFIG_FILE = "config/webhook.json"
+_WEBHOOK_CONFIG_POLL_SECONDS = 2.0
+
+# Largest accepted batch; each query gets its own worker so a batch waits on its slowest query
+_MAX_BATCH_QUERIES = 10
+
+# Accepted values of a query's optional "format" field; only markdown adds a rendered preview
+_EVIDENCE_FORMATS = (None, "json", "markdown")
+
+# Tracked client IPs; past this the least recently seen client's bucket is dropped
+_RATE_LIMIT_MAX_CLIENTS = 10000
+
+# Flask's jsonify accepted int keys; datetimes and other stragglers fall back to str()
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+# Webhook bodies add sorted keys so the signed bytes are canonical
+_WEBHOOK_ORJSON_OPTIONS = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize a response body with orjson"""
+    return orjson.dumps(obj, option=_ORJSON_OPTIONS, default=str)
+
+def _json_response(obj: Any) -> Response:
+    """orjson-backed replacement for flask.jsonify"""
+    return Response(_dumps(obj), mimetype='application/json')
+
+def _stream_json(head: Dict[str, Any], key: str, rows: Iterable[Any],
+                 tail: Optional[Callable[[int], Dict[str, Any]]] = None) -> Response:
+    """Stream a JSON object whose `key` array is serialized row by row as rows are produced"""
+    def generate():
+        started = False
+        try:
+            # head/tail are small dicts written around the array as plain members
+            opening = b"{" + b"".join(_dumps(k) + b":" + _dumps(v) + b"," for k, v in head.items()) + _dumps(key) + b":["
+            yield opening
+            started = True
+            count = 0
+            for row in rows:
+                yield (b"," if count else b"") + _dumps(row)
+                count += 1
+            members = tail(count) if tail else {}
+            yield b"]" + b"".join(b"," + _dumps(k) + b":" + _dumps(v) for k, v in members.items()) + b"}"
+        except Exception as e:
+            logger.error(f"Streaming response failed: {e}")
+            # The 200 status is already sent, so close the object with an error member to keep the body valid JSON
+            yield (b'],"error":' if started else b'{"error":') + _dumps(str(e)) + b"}"
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 # -----------------------------
 # API Endpoints System
 # -----------------------------
@@ -34,34 +101,74 @@ class APIEndpoints:
             "batch_processing_enabled": True
         }
         
-        # Webhook endpoints - load from file
+        # Webhook endpoints - load from file, then watch it for changes.
+        # Writers publish a fresh dict under the lock so readers can iterate a snapshot lock-free
         self.webhook_endpoints = {}
+        self._webhook_lock = threading.Lock()
+        self._webhook_cfg_mtime = None
         self._load_webhook_config()
+        threading.Thread(target=self._watch_webhook_config, name="webhook-config", daemon=True).start()
         
-        # Rate limiting
-        self.request_counts = {}
+        # Webhooks are delivered by background workers over pooled connections,
+        # so request handlers never wait on outbound HTTP
+        self._webhook_session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            # Gateway errors are transient; POST is opted in and receivers can dedupe on webhook_id + timestamp
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                              allowed_methods=frozenset(["POST"]), raise_on_status=False)
+        )
+        self._webhook_session.mount("http://", adapter)
+        self._webhook_session.mount("https://", adapter)
+        self._webhook_queue = queue.Queue(maxsize=_WEBHOOK_QUEUE_SIZE)
+        for i in range(_WEBHOOK_WORKERS):
+            threading.Thread(target=self._webhook_worker, name=f"webhook-{i}", daemon=True).start()
+        
+        # Batch queries are independent and I/O-bound (vector store + LLM), so they run side by side
+        self._batch_executor = ThreadPoolExecutor(max_workers=_MAX_BATCH_QUERIES, thread_name_prefix="batch")
+        
+        # Process-wide counter keeps generated IDs unique even within one clock tick
+        self._id_counter = itertools.count()
+        
+        # Keyed HMAC state per webhook secret; each signature copies it instead of re-deriving the key pads
+        self._hmac_prototypes = {}
+        
+        # Rate limiting: per-IP token buckets as [tokens, last_refill_monotonic], least recently seen first
+        self._rate_buckets = OrderedDict()
+        self._rate_lock = threading.Lock()
         
         # Register routes
         self._register_routes()
         
         logger.info("API Endpoints initialized")
     
+    def _webhook_config_mtime(self) -> Optional[float]:
+        """Return the webhook config file's mtime, or None if it does not exist"""
+        try:
+            return os.stat(_WEBHOOK_CONFIG_FILE).st_mtime
+        except FileNotFoundError:
+            return None
+    
     def _load_webhook_config(self):
         """Load webhook configuration from file"""
         try:
-            webhook_file = "config/webhook.json"
-            if os.path.exists(webhook_file):
-                with open(webhook_file, 'r') as f:
+            # Recorded before reading so a write that races the load triggers another reload
+            self._webhook_cfg_mtime = self._webhook_config_mtime()
+            if self._webhook_cfg_mtime is not None:
+                with open(_WEBHOOK_CONFIG_FILE, 'r') as f:
                     webhook_config = json.load(f)
                 
                 # Create a webhook endpoint from the configuration
                 webhook_id = "gradio_webhook"
-                self.webhook_endpoints[webhook_id] = {
+                endpoint = {
                     "url": webhook_config.get("url", ""),
                     "events": webhook_config.get("events", []),
                     "active": webhook_config.get("status") == "active",
                     "created_at": webhook_config.get("configured_at", datetime.now().isoformat())
                 }
+                with self._webhook_lock:
+                    self.webhook_endpoints = {**self.webhook_endpoints, webhook_id: endpoint}
                 
                 logger.info(f"Loaded webhook configuration: {webhook_config.get('url', 'No URL')}")
             else:
@@ -70,8 +177,18 @@ class APIEndpoints:
             logger.error(f"Failed to load webhook configuration: {e}")
     
     def _reload_webhook_config(self):
-        """Reload webhook configuration from file"""
-        self._load_webhook_config()
+        """Reload webhook configuration from file if it changed since the last load"""
+        if self._webhook_config_mtime() != self._webhook_cfg_mtime:
+            self._load_webhook_config()
+    
+    def _watch_webhook_config(self):
+        """Background poller that keeps webhook endpoints in sync with the config file"""
+        while True:
+            time.sleep(_WEBHOOK_CONFIG_POLL_SECONDS)
+            try:
+                self._reload_webhook_config()
+            except Exception as e:
+                logger.error(f"Webhook config watch failed: {e}")
     
     def _register_routes(self):
         """Register all API routes"""
@@ -79,7 +196,7 @@ class APIEndpoints:
         # Health check
         @self.app.route('/health', methods=['GET'])
         def health_check():
-            return jsonify({
+            return _json_response({
                 "status": "healthy",
                 "timestamp": datetime.now().isoformat(),
                 "version": self.api_config["version"]
@@ -147,25 +264,32 @@ class APIEndpoints:
         try:
             # Check rate limiting
             if not self._check_rate_limit(request):
-                return jsonify({"error": "Rate limit exceeded"}), 429
+                return _json_response({"error": "Rate limit exceeded"}), 429
             
             # Validate request
             data = request.get_json()
             if not data or 'query' not in data:
-                return jsonify({"error": "Missing query parameter"}), 400
+                return _json_response({"error": "Missing query parameter"}), 400
             
             # Extract parameters
             query = data['query']
             session_id = data.get('session_id', 'default_session')
             user_id = data.get('user_id', 'default_user')
+            evidence_top_k = data.get('evidence_top_k')
+            evidence_format = data.get('format')
+            
+            # Reject bad evidence options before the query runs, audits and fires webhooks
+            if evidence_top_k is not None and (
+                isinstance(evidence_top_k, bool) or not isinstance(evidence_top_k, int) or evidence_top_k < 0
+            ):
+                return _json_response({"error": "evidence_top_k must be a non-negative integer"}), 400
+            if evidence_format not in _EVIDENCE_FORMATS:
+                return _json_response({"error": "format must be 'json' or 'markdown'"}), 400
             
             # Check security permissions
             session_token = data.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "query"):
-                return jsonify({"error": "Insufficient permissions"}), 403
-            
-            # Reload webhook config before processing
-            self._reload_webhook_config()
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             # Get retriever for the session
             retriever = None
@@ -206,7 +330,11 @@ class APIEndpoints:
             else:
                 self._trigger_webhooks("query_processed", webhook_data)
             
-            return jsonify(result)
+            # Trim evidence server-side so clients receive only what they display
+            if evidence_top_k is not None or evidence_format:
+                result = self._compact_evidence(result, evidence_top_k, evidence_format)
+            
+            return _json_response(result)
             
         except Exception as e:
             logger.error(f"Query request failed: {e}")
@@ -217,91 +345,126 @@ class APIEndpoints:
                 "session_id": data.get('session_id', '') if 'data' in locals() else '',
                 "user_id": data.get('user_id', '') if 'data' in locals() else ''
             })
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
+    
+    def _compact_evidence(self, result: Dict[str, Any], top_k: Optional[int], output_format: Optional[str]) -> Dict[str, Any]:
+        """Truncate evidence clauses to top_k and optionally pre-render them as text"""
+        structured = result.get('structured_response')
+        if not structured or not structured.get('evidence'):
+            return result
+        
+        clauses = structured['evidence'].get('clauses', [])
+        if top_k is not None:
+            clauses = clauses[:top_k]
+            structured = {**structured, "evidence": {**structured['evidence'], "clauses": clauses}}
+            result = {**result, "structured_response": structured}
+            if isinstance(result.get('json_output'), dict):
+                result['json_output'] = structured
+        
+        if output_format == "markdown":
+            result = {**result, "evidence_text": EvidenceMapper.format_evidence_text(clauses, len(clauses))}
+        
+        return result
     
     def _handle_batch_query_request(self) -> Response:
         """Handle batch query request"""
         try:
             # Check rate limiting
             if not self._check_rate_limit(request):
-                return jsonify({"error": "Rate limit exceeded"}), 429
+                return _json_response({"error": "Rate limit exceeded"}), 429
             
             # Validate request
             data = request.get_json()
             if not data or 'queries' not in data:
-                return jsonify({"error": "Missing queries parameter"}), 400
+                return _json_response({"error": "Missing queries parameter"}), 400
             
             queries = data['queries']
-            if not isinstance(queries, list) or len(queries) > 10:  # Limit batch size
-                return jsonify({"error": "Invalid queries format or too many queries"}), 400
+            if not isinstance(queries, list) or len(queries) > _MAX_BATCH_QUERIES:
+                return _json_response({"error": "Invalid queries format or too many queries"}), 400
             
             # Check security permissions
             session_token = data.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "batch_query"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
-            # Process batch queries
-            results = []
-            for i, query_data in enumerate(queries):
-                if isinstance(query_data, dict):
-                    query = query_data.get('query', '')
-                    session_id = query_data.get('session_id', f'batch_session_{i}')
-                    user_id = query_data.get('user_id', 'default_user')
-                else:
-                    query = str(query_data)
-                    session_id = f'batch_session_{i}'
-                    user_id = 'default_user'
-                
+            # Submit every query up front; results are streamed in request order as each one
+            # and its predecessors finish, independent of how long the client stays connected
+            futures = [self._batch_executor.submit(self._run_batch_query, i, query_data)
+                       for i, query_data in enumerate(queries)]
+            user_id = data.get('user_id', 'default_user')
+            
+            def record_batch():
+                # Runs when the response is closed, so a client disconnect still leaves the audit record and webhook
                 try:
-                    result = self.qa_chain.run(query, None, session_id, user_id)
-                    results.append({
-                        "query": query,
-                        "result": result,
-                        "status": "success"
+                    results = [future.result() for future in futures]
+                    
+                    # Log batch data access
+                    self.security_manager.log_data_access(user_id, "batch_query", "process", {
+                        "query_count": len(queries),
+                        "success_count": len([r for r in results if r["status"] == "success"])
                     })
+                    
+                    # Trigger webhooks
+                    self._trigger_webhooks("batch_query_processed", {"results": results})
                 except Exception as e:
-                    results.append({
-                        "query": query,
-                        "error": str(e),
-                        "status": "error"
-                    })
+                    logger.error(f"Batch query bookkeeping failed: {e}")
             
-            # Log batch data access
-            user_id = data.get('user_id', 'default_user')
-            self.security_manager.log_data_access(user_id, "batch_query", "process", {
-                "query_count": len(queries),
-                "success_count": len([r for r in results if r["status"] == "success"])
-            })
-            
-            # Trigger webhooks
-            self._trigger_webhooks("batch_query_processed", {"results": results})
-            
-            return jsonify({
-                "batch_id": f"batch_{datetime.now().timestamp()}",
-                "total_queries": len(queries),
-                "results": results
-            })
+            response = _stream_json(
+                {"batch_id": self._new_id("batch"), "total_queries": len(queries)},
+                "results", (future.result() for future in futures)
+            )
+            response.call_on_close(record_batch)
+            return response
             
         except Exception as e:
             logger.error(f"Batch query request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
+    
+    def _new_id(self, prefix: str) -> str:
+        """Mint a unique, opaque identifier such as batch_<ns>_<n>"""
+        return f"{prefix}_{time.monotonic_ns()}_{next(self._id_counter)}"
+    
+    def _run_batch_query(self, i: int, query_data: Any) -> Dict[str, Any]:
+        """Run one query of a batch and wrap its outcome"""
+        if isinstance(query_data, dict):
+            query = query_data.get('query', '')
+            session_id = query_data.get('session_id', f'batch_session_{i}')
+            user_id = query_data.get('user_id', 'default_user')
+        else:
+            query = str(query_data)
+            session_id = f'batch_session_{i}'
+            user_id = 'default_user'
+        
+        try:
+            result = self.qa_chain.run(query, None, session_id, user_id)
+            return {
+                "query": query,
+                "result": result,
+                "status": "success"
+            }
+        except Exception as e:
+            return {
+                "query": query,
+                "error": str(e),
+                "status": "error"
+            }
     
     def _handle_document_processing(self) -> Response:
         """Handle document processing request"""
         try:
             # Check rate limiting
             if not self._check_rate_limit(request):
-                return jsonify({"error": "Rate limit exceeded"}), 429
+                return _json_response({"error": "Rate limit exceeded"}), 429
             
             # Validate request
             data = request.get_json()
             if not data or 'documents' not in data:
-                return jsonify({"error": "Missing documents parameter"}), 400
+                return _json_response({"error": "Missing documents parameter"}), 400
             
             # Check security permissions
             session_token = data.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "document_upload"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             documents = data['documents']
             results = []
@@ -309,7 +472,7 @@ class APIEndpoints:
             for doc in documents:
                 try:
                     # Process document (placeholder for actual document processing)
-                    doc_id = doc.get('id', f"doc_{datetime.now().timestamp()}")
+                    doc_id = doc['id'] if 'id' in doc else self._new_id("doc")
                     doc_type = doc.get('type', 'unknown')
                     
                     results.append({
@@ -336,15 +499,15 @@ class APIEndpoints:
             # Trigger webhooks
             self._trigger_webhooks("documents_processed", {"results": results})
             
-            return jsonify({
-                "processing_id": f"proc_{datetime.now().timestamp()}",
+            return _json_response({
+                "processing_id": self._new_id("proc"),
                 "total_documents": len(documents),
                 "results": results
             })
             
         except Exception as e:
             logger.error(f"Document processing request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_audit_trail_request(self) -> Response:
         """Handle audit trail request"""
@@ -352,7 +515,7 @@ class APIEndpoints:
             # Check security permissions
             session_token = request.args.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "audit_read"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             # Get query parameters
             session_id = request.args.get('session_id')
@@ -361,8 +524,8 @@ class APIEndpoints:
             end_date = request.args.get('end_date')
             action_type = request.args.get('action_type')
             
-            # Get audit trail
-            audit_trail = self.qa_chain.get_audit_trail(
+            # Stream the audit trail entry by entry instead of materializing it
+            audit_trail = self.qa_chain.iter_audit_trail(
                 session_id=session_id,
                 user_id=user_id,
                 start_date=datetime.fromisoformat(start_date) if start_date else None,
@@ -370,21 +533,19 @@ class APIEndpoints:
                 action_type=action_type
             )
             
-            return jsonify({
-                "audit_trail": audit_trail,
-                "total_entries": len(audit_trail),
-                "filters": {
-                    "session_id": session_id,
-                    "user_id": user_id,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "action_type": action_type
-                }
-            })
+            filters = {
+                "session_id": session_id,
+                "user_id": user_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                "action_type": action_type
+            }
+            return _stream_json({}, "audit_trail", audit_trail,
+                                lambda count: {"total_entries": count, "filters": filters})
             
         except Exception as e:
             logger.error(f"Audit trail request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_cache_stats_request(self) -> Response:
         """Handle cache statistics request"""
@@ -392,14 +553,14 @@ class APIEndpoints:
             # Check security permissions
             session_token = request.args.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "cache_read"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             stats = self.cache_manager.get_cache_statistics()
-            return jsonify(stats)
+            return _json_response(stats)
             
         except Exception as e:
             logger.error(f"Cache stats request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_security_stats_request(self) -> Response:
         """Handle security statistics request"""
@@ -407,14 +568,14 @@ class APIEndpoints:
             # Check security permissions
             session_token = request.args.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "security_read"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             stats = self.security_manager.get_security_statistics()
-            return jsonify(stats)
+            return _json_response(stats)
             
         except Exception as e:
             logger.error(f"Security stats request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_gdpr_export(self, user_id: str) -> Response:
         """Handle GDPR data export request"""
@@ -422,14 +583,14 @@ class APIEndpoints:
             # Check security permissions
             session_token = request.args.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "gdpr_export"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             export_data = self.security_manager.export_user_data(user_id)
-            return jsonify(export_data)
+            return _json_response(export_data)
             
         except Exception as e:
             logger.error(f"GDPR export request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_gdpr_deletion(self, user_id: str) -> Response:
         """Handle GDPR data deletion request"""
@@ -437,27 +598,27 @@ class APIEndpoints:
             # Check security permissions
             session_token = request.args.get('session_token')
             if session_token and not self.security_manager.check_permission(session_token, "gdpr_delete"):
-                return jsonify({"error": "Insufficient permissions"}), 403
+                return _json_response({"error": "Insufficient permissions"}), 403
             
             success = self.security_manager.delete_user_data(user_id)
             
             if success:
-                return jsonify({"status": "success", "message": f"Data deleted for user {user_id}"})
+                return _json_response({"status": "success", "message": f"Data deleted for user {user_id}"})
             else:
-                return jsonify({"error": "Failed to delete user data"}), 500
+                return _json_response({"error": "Failed to delete user data"}), 500
             
         except Exception as e:
             logger.error(f"GDPR deletion request failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_webhook_registration(self) -> Response:
         """Handle webhook registration"""
         try:
             data = request.get_json()
             if not data or 'url' not in data:
-                return jsonify({"error": "Missing URL parameter"}), 400
+                return _json_response({"error": "Missing URL parameter"}), 400
             
-            webhook_id = f"webhook_{datetime.now().timestamp()}"
+            webhook_id = self._new_id("webhook")
             webhook_config = {
                 "url": data['url'],
                 "events": data.get('events', ['query_processed']),
@@ -466,9 +627,10 @@ class APIEndpoints:
                 "created_at": datetime.now().isoformat()
             }
             
-            self.webhook_endpoints[webhook_id] = webhook_config
+            with self._webhook_lock:
+                self.webhook_endpoints = {**self.webhook_endpoints, webhook_id: webhook_config}
             
-            return jsonify({
+            return _json_response({
                 "webhook_id": webhook_id,
                 "status": "registered",
                 "config": webhook_config
@@ -476,20 +638,23 @@ class APIEndpoints:
             
         except Exception as e:
             logger.error(f"Webhook registration failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_webhook_unregistration(self, webhook_id: str) -> Response:
         """Handle webhook unregistration"""
         try:
-            if webhook_id in self.webhook_endpoints:
-                del self.webhook_endpoints[webhook_id]
-                return jsonify({"status": "unregistered", "webhook_id": webhook_id})
+            with self._webhook_lock:
+                endpoints = dict(self.webhook_endpoints)
+                removed = endpoints.pop(webhook_id, None) is not None
+                self.webhook_endpoints = endpoints
+            if removed:
+                return _json_response({"status": "unregistered", "webhook_id": webhook_id})
             else:
-                return jsonify({"error": "Webhook not found"}), 404
+                return _json_response({"error": "Webhook not found"}), 404
             
         except Exception as e:
             logger.error(f"Webhook unregistration failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_session_creation(self) -> Response:
         """Handle session creation"""
@@ -501,18 +666,18 @@ class APIEndpoints:
             session_token = self.security_manager.create_user_session(user_id, permissions)
             
             if session_token:
-                return jsonify({
+                return _json_response({
                     "session_token": session_token,
                     "user_id": user_id,
                     "permissions": permissions,
                     "expires_in": self.security_manager.security_config["session_timeout"]
                 })
             else:
-                return jsonify({"error": "Failed to create session"}), 500
+                return _json_response({"error": "Failed to create session"}), 500
             
         except Exception as e:
             logger.error(f"Session creation failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _handle_session_invalidation(self, session_token: str) -> Response:
         """Handle session invalidation"""
@@ -520,13 +685,13 @@ class APIEndpoints:
             success = self.security_manager.invalidate_session(session_token)
             
             if success:
-                return jsonify({"status": "invalidated", "session_token": session_token})
+                return _json_response({"status": "invalidated", "session_token": session_token})
             else:
-                return jsonify({"error": "Session not found or already invalidated"}), 404
+                return _json_response({"error": "Session not found or already invalidated"}), 404
             
         except Exception as e:
             logger.error(f"Session invalidation failed: {e}")
-            return jsonify({"error": str(e)}), 500
+            return _json_response({"error": str(e)}), 500
     
     def _check_rate_limit(self, request) -> bool:
         """Check rate limiting"""
@@ -535,98 +700,121 @@ class APIEndpoints:
                 return True
             
             client_ip = request.remote_addr
-            current_time = datetime.now()
-            
-            # Clean old entries
-            self.request_counts = {
-                ip: times for ip, times in self.request_counts.items()
-                if (current_time - times[-1]).total_seconds() < 60
-            }
-            
-            # Check rate limit
-            if client_ip in self.request_counts:
-                recent_requests = [
-                    time for time in self.request_counts[client_ip]
-                    if (current_time - time).total_seconds() < 60
-                ]
+            capacity = self.api_config["max_requests_per_minute"]
+            refill_rate = capacity / 60.0  # tokens per second
+            now = time.monotonic()
+            
+            with self._rate_lock:
+                bucket = self._rate_buckets.get(client_ip)
+                if bucket is None:
+                    # Forget the least recently seen client; a bucket idle for a minute is full again anyway
+                    if len(self._rate_buckets) >= _RATE_LIMIT_MAX_CLIENTS:
+                        self._rate_buckets.popitem(last=False)
+                    bucket = self._rate_buckets[client_ip] = [float(capacity), now]
+                else:
+                    self._rate_buckets.move_to_end(client_ip)
+                    bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+                    bucket[1] = now
                 
-                if len(recent_requests) >= self.api_config["max_requests_per_minute"]:
+                if bucket[0] < 1:
                     return False
                 
-                self.request_counts[client_ip] = recent_requests
-            
-            # Add current request
-            if client_ip not in self.request_counts:
-                self.request_counts[client_ip] = []
-            
-            self.request_counts[client_ip].append(current_time)
-            
-            return True
+                bucket[0] -= 1
+                return True
             
         except Exception as e:
             logger.error(f"Rate limit check failed: {e}")
             return True  # Allow request if rate limiting fails
     
     def _trigger_webhooks(self, event_type: str, data: Dict[str, Any]):
-        """Trigger webhooks for events"""
+        """Queue webhook deliveries for an event without blocking the caller"""
         try:
             if not self.api_config["webhook_enabled"]:
                 return
             
-            import requests
-            
-            for webhook_id, webhook_config in self.webhook_endpoints.items():
+            # Snapshot once; config reloads and (un)registrations publish a new dict
+            endpoints = self.webhook_endpoints
+            timestamp = datetime.now().isoformat()
+            data_bytes = None
+            for webhook_id, webhook_config in endpoints.items():
                 if not webhook_config.get("active", False):
                     continue
                 
                 if event_type not in webhook_config.get("events", []):
                     continue
                 
-                try:
-                    payload = {
-                        "event_type": event_type,
-                        "webhook_id": webhook_id,
-                        "timestamp": datetime.now().isoformat(),
-                        "data": data
-                    }
-                    
-                    # Add secret if configured
-                    if webhook_config.get("secret"):
-                        payload["signature"] = self._generate_webhook_signature(
-                            payload, webhook_config["secret"]
-                        )
-                    
-                    # Send webhook
-                    response = requests.post(
-                        webhook_config["url"],
-                        json=payload,
-                        timeout=10
+                payload = {
+                    "event_type": event_type,
+                    "webhook_id": webhook_id,
+                    "timestamp": timestamp,
+                    "data": data
+                }
+                
+                if data_bytes is None:
+                    # data dominates the payload and is shared by every recipient, so encode it once
+                    data_bytes = orjson.dumps(data, option=_WEBHOOK_ORJSON_OPTIONS, default=str)
+                # Receivers verify the exact bytes on the wire, so the body is sent pre-encoded
+                body = self._encode_webhook_payload(payload, data_bytes)
+                headers = {"Content-Type": "application/json"}
+                
+                # Add signature if a secret is configured
+                if webhook_config.get("secret"):
+                    headers["X-Webhook-Signature"] = self._generate_webhook_signature(
+                        payload, webhook_config["secret"], body
                     )
-                    
-                    if response.status_code != 200:
-                        logger.warning(f"Webhook {webhook_id} failed: {response.status_code}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to trigger webhook {webhook_id}: {e}")
+                
+                try:
+                    self._webhook_queue.put_nowait((webhook_id, webhook_config["url"], body, headers))
+                except queue.Full:
+                    logger.error(f"Webhook queue full, dropping {event_type} event for {webhook_id}")
                     
         except Exception as e:
             logger.error(f"Webhook triggering failed: {e}")
     
-    def _generate_webhook_signature(self, payload: Dict[str, Any], secret: str) -> str:
+    def _webhook_worker(self):
+        """Deliver queued webhooks until the process exits"""
+        while True:
+            webhook_id, url, body, headers = self._webhook_queue.get()
+            try:
+                response = self._webhook_session.post(url, data=body, headers=headers, timeout=_WEBHOOK_TIMEOUT)
+                
+                if response.status_code != 200:
+                    logger.warning(f"Webhook {webhook_id} failed: {response.status_code}")
+                
+            except Exception as e:
+                logger.error(f"Failed to trigger webhook {webhook_id}: {e}")
+            finally:
+                self._webhook_queue.task_done()
+    
+    def wait_for_webhooks(self):
+        """Block until every queued webhook has been delivered or has failed"""
+        self._webhook_queue.join()
+    
+    def _encode_webhook_payload(self, payload: Dict[str, Any], data_bytes: Optional[bytes] = None) -> bytes:
+        """Encode a webhook payload in its canonical form: orjson bytes with sorted keys, no whitespace"""
+        if data_bytes is None:
+            return orjson.dumps(payload, option=_WEBHOOK_ORJSON_OPTIONS, default=str)
+        # Same bytes as above, spliced around data that was already encoded for this event
+        return b"".join((
+            b'{"data":', data_bytes,
+            b',"event_type":', orjson.dumps(payload["event_type"]),
+            b',"timestamp":', orjson.dumps(payload["timestamp"]),
+            b',"webhook_id":', orjson.dumps(payload["webhook_id"]), b"}"
+        ))
+    
+    def _generate_webhook_signature(self, payload: Dict[str, Any], secret: str,
+                                    payload_bytes: Optional[bytes] = None) -> str:
         """Generate webhook signature for security"""
         try:
-            import hmac
-            import hashlib
-            
-            # Create signature from payload
-            payload_str = json.dumps(payload, sort_keys=True)
-            signature = hmac.new(
-                secret.encode('utf-8'),
-                payload_str.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            return signature
+            if payload_bytes is None:
+                payload_bytes = self._encode_webhook_payload(payload)
+            
+            prototype = self._hmac_prototypes.get(secret)
+            if prototype is None:
+                prototype = self._hmac_prototypes[secret] = hmac.new(secret.encode('utf-8'), None, hashlib.sha256)
+            signer = prototype.copy()
+            signer.update(payload_bytes)
+            return signer.hexdigest()
             
         except Exception as e:
             logger.error(f"Failed to generate webhook signature: {e}")
@@ -48,13 +48,20 @@ class APIKeyManager:
     OPTIONAL_KEYS = {
         'PINECONE_INDEX': 'rag_gradio',
         'EMBED_MODEL': 'microsoft/multilingual-e5-large',
-        'LLM_MODEL': 'llama-3.3-70b-versatile'
+        'LLM_MODEL': 'llama-3.3-70b-versatile',
+        'DEBUG': 'false'
     }
+    
+    _config: Optional[Dict[str, str]] = None  # Validated config, loaded once per process
 
     @staticmethod
     def load_and_validate() -> Dict[str, str]:
         """Load environment variables and validate required keys"""
-        load_dotenv(dotenv_path="D:\OneDrive\Desktop\hackrx_AI_rag\myenv\.env")
+        if APIKeyManager._config is not None:
+            return dict(APIKeyManager._config)
+        
+        # APP_ENV_FILE points at a specific .env; otherwise search upwards from the project
+        load_dotenv(dotenv_path=os.getenv("APP_ENV_FILE"))
         
         # Check required keys
         missing = [key for key in APIKeyManager.REQUIRED_KEYS if not os.getenv(key)]
@@ -72,4 +79,5 @@ class APIKeyManager:
             config[key] = os.getenv(key, default)
         
         logger.info("API keys loaded and validated successfully")
-        return config
\ No newline at end of file
+        APIKeyManager._config = config
+        return dict(config)
\ No newline at end of file
@@ -178,6 +178,15 @@ class EvidenceMapper:
         
         return structured_response
     
+    @staticmethod
+    def format_evidence_text(clauses: List[Dict], top_k: int = 5) -> str:
+        """Render the top evidence clauses as a preview string for display"""
+        return "\n\n---\n\n".join(
+            f"{i+1}. [{c.get('clause_id', 'Unknown')}] {c.get('summary', c.get('clause_text', '').strip())} "
+            f"(Relevance: {c.get('decision_relevance', 'Unknown')}, Strength: {c.get('evidence_strength', 'Unknown')})"
+            for i, c in enumerate(clauses[:top_k])
+        )
+    
     def _map_clauses_to_decision(self, 
                                 clauses: List[Dict], 
                                 decision: str, 
@@ -1,37 +1,115 @@
+import functools
 import logging
-from typing import Dict, List, Any, Optional
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 from src.api.setup_api import logger
 
+# Procedure keyword lists, each compiled to one alternation so a check is a single scan
+_COVERED_PROCEDURES = ["knee surgery", "cataract", "angioplasty", "delivery"]
+_EXCLUDED_PROCEDURES = ["cosmetic", "experimental"]
+_PRE_AUTH_PROCEDURES = ["surgery", "angioplasty", "bypass", "ivf"]
+
+_COVERED_RE = re.compile("|".join(map(re.escape, _COVERED_PROCEDURES)))
+_EXCLUDED_RE = re.compile("|".join(map(re.escape, _EXCLUDED_PROCEDURES)))
+_PRE_AUTH_RE = re.compile("|".join(map(re.escape, _PRE_AUTH_PROCEDURES)))
+
+def _parse_int(value: Any) -> Optional[int]:
+    """Parse an entity field as an int; malformed values count as missing for the steps that need them"""
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+# -----------------------------
+# Reasoning Result Types
+# -----------------------------
+class StepResult(NamedTuple):
+    """Outcome of a single reasoning step or chain decision"""
+    status: str
+    reason: str
+    amount: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the JSON-ready dict shape used by the API"""
+        if self.amount is None:
+            return {"status": self.status, "reason": self.reason}
+        return {"status": self.status, "amount": self.amount, "reason": self.reason}
+
+class ChainResult(NamedTuple):
+    """Outcome of a full reasoning chain"""
+    chain_name: str
+    steps: Tuple[Tuple[str, StepResult], ...]
+    chain_decision: StepResult
+    confidence: float
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the JSON-ready dict shape used by the API"""
+        return {
+            "chain_name": self.chain_name,
+            "steps": [{"step": step, "result": result.to_dict()} for step, result in self.steps],
+            "chain_decision": self.chain_decision.to_dict(),
+            "confidence": self.confidence
+        }
+
 # -----------------------------
 # Multi-Hop Reasoning System
 # -----------------------------
 class MultiHopReasoner:
     """Advanced reasoning system that chains multiple queries and reasoning steps"""
     
+    __slots__ = ("_step_dispatch", "_executor", "_plan_cache")
+    
+    # Chain name -> ordered step names; shared by every instance and read-only
+    REASONING_CHAINS = MappingProxyType({
+        "demographic_eligibility": (
+            "age_verification",
+            "gender_specific_coverage",
+            "policy_duration_check"
+        ),
+        "procedure_coverage": (
+            "procedure_eligibility",
+            "pre_authorization_requirements",
+            "network_coverage_check"
+        ),
+        "medical_complexity": (
+            "condition_assessment",
+            "comorbidity_analysis",
+            "risk_factor_evaluation"
+        ),
+        "policy_analysis": (
+            "waiting_period_check",
+            "exclusion_verification",
+            "coverage_limit_analysis"
+        )
+    })
+    
     def __init__(self):
-        self.reasoning_chains = {
-            "demographic_eligibility": [
-                "age_verification",
-                "gender_specific_coverage",
-                "policy_duration_check"
-            ],
-            "procedure_coverage": [
-                "procedure_eligibility",
-                "pre_authorization_requirements",
-                "network_coverage_check"
-            ],
-            "medical_complexity": [
-                "condition_assessment",
-                "comorbidity_analysis",
-                "risk_factor_evaluation"
-            ],
-            "policy_analysis": [
-                "waiting_period_check",
-                "exclusion_verification",
-                "coverage_limit_analysis"
-            ]
+        # Step name -> handler, built once so dispatch is a single dict lookup
+        self._step_dispatch = {
+            "age_verification": self._verify_age_eligibility,
+            "gender_specific_coverage": self._check_gender_coverage,
+            "policy_duration_check": self._check_policy_duration,
+            "procedure_eligibility": self._check_procedure_eligibility,
+            "pre_authorization_requirements": self._check_pre_authorization,
+            "network_coverage_check": self._check_network_coverage,
+            "condition_assessment": self._assess_medical_condition,
+            "comorbidity_analysis": self._analyze_comorbidities,
+            "risk_factor_evaluation": self._evaluate_risk_factors,
+            "waiting_period_check": self._check_waiting_periods,
+            "exclusion_verification": self._verify_exclusions,
+            "coverage_limit_analysis": self._analyze_coverage_limits
         }
         
+        # Steps are independent, so a plan's steps run side by side
+        self._executor = ThreadPoolExecutor(max_workers=len(self.REASONING_CHAINS),
+                                            thread_name_prefix="reasoning")
+        
+        # Chain results keyed on (active chains, normalized entities); steps are pure functions of those
+        self._plan_cache = functools.lru_cache(maxsize=512)(self._execute_cached_plan)
+        
         logger.info("Multi-Hop Reasoner initialized")
     
     def execute_reasoning_chain(self, 
@@ -41,19 +119,17 @@ class MultiHopReasoner:
         try:
             # Determine which reasoning chains to execute
             active_chains = self._identify_active_chains(query_context)
+            norm = self._normalize(query_context.get("parsed_entities", {}))
             
-            # Execute each chain
-            chain_results = {}
-            for chain_name in active_chains:
-                chain_results[chain_name] = self._execute_single_chain(
-                    chain_name, query_context, documents
-                )
+            # Execute every step of every active chain as one flat plan
+            chain_results = self._execute_chains(tuple(active_chains), norm, documents)
             
             # Synthesize results
             final_result = self._synthesize_results(chain_results, query_context)
             
+            # Convert to plain dicts only here, at the API boundary
             return {
-                "reasoning_chains": chain_results,
+                "reasoning_chains": {name: chain.to_dict() for name, chain in chain_results.items()},
                 "final_decision": final_result,
                 "confidence_score": self._calculate_chain_confidence(chain_results),
                 "reasoning_path": self._generate_reasoning_path(chain_results)
@@ -90,280 +166,296 @@ class MultiHopReasoner:
         
         return active_chains
     
-    def _execute_single_chain(self, 
-                             chain_name: str, 
-                             query_context: Dict[str, Any], 
-                             documents: List[Any]) -> Dict[str, Any]:
-        """Execute a single reasoning chain"""
-        chain_steps = self.reasoning_chains.get(chain_name, [])
-        step_results = []
-        
-        for step in chain_steps:
-            step_result = self._execute_reasoning_step(step, query_context, documents)
-            step_results.append({
-                "step": step,
-                "result": step_result
-            })
-        
-        return {
-            "chain_name": chain_name,
-            "steps": step_results,
-            "chain_decision": self._evaluate_chain_decision(step_results),
-            "confidence": self._calculate_step_confidence(step_results)
-        }
+    def _normalize(self, parsed: Dict[str, Any]) -> SimpleNamespace:
+        """Lowercase and parse the entity fields the reasoning steps share, once per query"""
+        age = parsed.get("age")
+        duration = parsed.get("policy_duration") or ""
+        condition = parsed.get("medical_condition") or ""
+        
+        return SimpleNamespace(
+            age_int=_parse_int(age),
+            gender=parsed.get("gender"),
+            procedure=(parsed.get("procedure") or "").lower(),
+            location=parsed.get("location", ""),
+            medical_condition=condition,
+            medical_condition_lc=condition.lower(),
+            urgency=parsed.get("urgency", "normal"),
+            policy_duration=duration,
+            months_int=_parse_int(duration.split()[0]) if "month" in duration else None,
+            coverage_type=parsed.get("coverage_type", "basic")
+        )
+    
+    def _execute_chains(self, 
+                        active_chains: Tuple[str, ...], 
+                        norm: SimpleNamespace, 
+                        documents: List[Any]) -> Dict[str, ChainResult]:
+        """Execute the active chains, reusing the results for repeated entities"""
+        # No step reads documents yet; a step that does must bypass this cache
+        norm_key = tuple(sorted(vars(norm).items()))
+        try:
+            return self._plan_cache(active_chains, norm_key)
+        except TypeError:
+            # Unhashable entity values cannot be cached
+            return self._run_plan(active_chains, norm, documents)
+    
+    def _execute_cached_plan(self, active_chains: Tuple[str, ...], norm_key: tuple) -> Dict[str, ChainResult]:
+        """Run the active chains from their cache key"""
+        return self._run_plan(active_chains, SimpleNamespace(**dict(norm_key)), [])
+    
+    def _run_plan(self, 
+                  active_chains: Tuple[str, ...], 
+                  norm: SimpleNamespace, 
+                  documents: List[Any]) -> Dict[str, ChainResult]:
+        """Run all steps of the active chains as a flat plan and regroup them by chain"""
+        plan = [(chain_name, step)
+                for chain_name in active_chains
+                for step in self.REASONING_CHAINS.get(chain_name, ())]
+        
+        # map keeps results in plan order
+        run_step = lambda item: self._execute_reasoning_step(item[1], norm, documents)
+        if len(plan) > 1:
+            results = self._executor.map(run_step, plan)
+        else:
+            results = map(run_step, plan)
+        
+        steps_by_chain = defaultdict(list)
+        for (chain_name, step), result in zip(plan, results):
+            steps_by_chain[chain_name].append((step, result))
+        
+        chain_results = {}
+        for chain_name in active_chains:
+            step_results = tuple(steps_by_chain[chain_name])
+            chain_results[chain_name] = ChainResult(
+                chain_name=chain_name,
+                steps=step_results,
+                chain_decision=self._evaluate_chain_decision(step_results),
+                confidence=self._calculate_step_confidence(step_results)
+            )
+        return chain_results
     
     def _execute_reasoning_step(self, 
                                step: str, 
-                               query_context: Dict[str, Any], 
-                               documents: List[Any]) -> Dict[str, Any]:
+                               norm: SimpleNamespace, 
+                               documents: List[Any]) -> StepResult:
         """Execute a single reasoning step"""
-        parsed = query_context.get("parsed_entities", {})
-        
-        if step == "age_verification":
-            return self._verify_age_eligibility(parsed, documents)
-        elif step == "gender_specific_coverage":
-            return self._check_gender_coverage(parsed, documents)
-        elif step == "policy_duration_check":
-            return self._check_policy_duration(parsed, documents)
-        elif step == "procedure_eligibility":
-            return self._check_procedure_eligibility(parsed, documents)
-        elif step == "pre_authorization_requirements":
-            return self._check_pre_authorization(parsed, documents)
-        elif step == "network_coverage_check":
-            return self._check_network_coverage(parsed, documents)
-        elif step == "condition_assessment":
-            return self._assess_medical_condition(parsed, documents)
-        elif step == "comorbidity_analysis":
-            return self._analyze_comorbidities(parsed, documents)
-        elif step == "risk_factor_evaluation":
-            return self._evaluate_risk_factors(parsed, documents)
-        elif step == "waiting_period_check":
-            return self._check_waiting_periods(parsed, documents)
-        elif step == "exclusion_verification":
-            return self._verify_exclusions(parsed, documents)
-        elif step == "coverage_limit_analysis":
-            return self._analyze_coverage_limits(parsed, documents)
-        else:
-            return {"status": "unknown_step", "reason": f"Unknown reasoning step: {step}"}
+        handler = self._step_dispatch.get(step)
+        if handler is None:
+            return StepResult("unknown_step", f"Unknown reasoning step: {step}")
+        return handler(norm, documents)
     
-    def _verify_age_eligibility(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _verify_age_eligibility(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Verify age-based eligibility"""
-        if not parsed.get("age"):
-            return {"status": "unknown", "reason": "Age not specified"}
+        if norm.age_int is None:
+            return StepResult("unknown", "Age not specified")
         
-        age = int(parsed["age"])
+        age = norm.age_int
         
         # Check age-based eligibility rules
         if age < 18:
-            return {"status": "restricted", "reason": "Pediatric coverage may have different rules"}
+            return StepResult("restricted", "Pediatric coverage may have different rules")
         elif age > 65:
-            return {"status": "restricted", "reason": "Geriatric coverage may have different rules"}
+            return StepResult("restricted", "Geriatric coverage may have different rules")
         else:
-            return {"status": "eligible", "reason": "Age within standard coverage range"}
+            return StepResult("eligible", "Age within standard coverage range")
     
-    def _check_gender_coverage(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_gender_coverage(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check gender-specific coverage rules"""
-        if not parsed.get("gender"):
-            return {"status": "unknown", "reason": "Gender not specified"}
+        if not norm.gender:
+            return StepResult("unknown", "Gender not specified")
         
-        gender = parsed["gender"]
-        procedure = parsed.get("procedure", "").lower()
+        gender = norm.gender
+        pregnancy = "pregnancy" in norm.procedure
         
         # Check for gender-specific procedures
-        if gender == "F" and "pregnancy" in procedure:
-            return {"status": "eligible", "reason": "Female-specific procedure covered"}
-        elif gender == "M" and "pregnancy" in procedure:
-            return {"status": "ineligible", "reason": "Gender-procedure mismatch"}
+        if gender == "F" and pregnancy:
+            return StepResult("eligible", "Female-specific procedure covered")
+        elif gender == "M" and pregnancy:
+            return StepResult("ineligible", "Gender-procedure mismatch")
         else:
-            return {"status": "eligible", "reason": "No gender-specific restrictions"}
+            return StepResult("eligible", "No gender-specific restrictions")
     
-    def _check_policy_duration(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_policy_duration(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check policy duration requirements"""
-        if not parsed.get("policy_duration"):
-            return {"status": "unknown", "reason": "Policy duration not specified"}
-        
-        duration = parsed["policy_duration"]
+        if not norm.policy_duration:
+            return StepResult("unknown", "Policy duration not specified")
         
-        if "month" in duration:
-            months = int(duration.split()[0])
-            if months < 3:
-                return {"status": "restricted", "reason": "Policy duration below minimum requirement"}
+        if norm.months_int is not None:
+            if norm.months_int < 3:
+                return StepResult("restricted", "Policy duration below minimum requirement")
             else:
-                return {"status": "eligible", "reason": "Policy duration meets requirements"}
+                return StepResult("eligible", "Policy duration meets requirements")
         else:
-            return {"status": "eligible", "reason": "Policy duration acceptable"}
+            return StepResult("eligible", "Policy duration acceptable")
     
-    def _check_procedure_eligibility(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_procedure_eligibility(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check if procedure is covered"""
-        if not parsed.get("procedure"):
-            return {"status": "unknown", "reason": "Procedure not specified"}
+        if not norm.procedure:
+            return StepResult("unknown", "Procedure not specified")
         
-        procedure = parsed["procedure"].lower()
+        procedure = norm.procedure
         
         # Check against document content for coverage
-        covered_procedures = ["knee surgery", "cataract", "angioplasty", "delivery"]
-        excluded_procedures = ["cosmetic", "experimental"]
-        
-        if any(proc in procedure for proc in covered_procedures):
-            return {"status": "covered", "reason": "Procedure is covered under policy"}
-        elif any(proc in procedure for proc in excluded_procedures):
-            return {"status": "excluded", "reason": "Procedure is excluded from coverage"}
+        if _COVERED_RE.search(procedure):
+            return StepResult("covered", "Procedure is covered under policy")
+        elif _EXCLUDED_RE.search(procedure):
+            return StepResult("excluded", "Procedure is excluded from coverage")
         else:
-            return {"status": "conditional", "reason": "Procedure coverage depends on specific circumstances"}
+            return StepResult("conditional", "Procedure coverage depends on specific circumstances")
     
-    def _check_pre_authorization(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_pre_authorization(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check pre-authorization requirements"""
-        procedure = parsed.get("procedure", "").lower()
-        
         # Procedures requiring pre-authorization
-        pre_auth_procedures = ["surgery", "angioplasty", "bypass", "ivf"]
-        
-        if any(proc in procedure for proc in pre_auth_procedures):
-            return {"status": "required", "reason": "Pre-authorization required for this procedure"}
+        if _PRE_AUTH_RE.search(norm.procedure):
+            return StepResult("required", "Pre-authorization required for this procedure")
         else:
-            return {"status": "not_required", "reason": "No pre-authorization required"}
+            return StepResult("not_required", "No pre-authorization required")
     
-    def _check_network_coverage(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_network_coverage(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check network coverage for location"""
-        location = parsed.get("location", "")
+        location = norm.location
         
         if location:
-            return {"status": "covered", "reason": f"Network coverage available in {location}"}
+            return StepResult("covered", f"Network coverage available in {location}")
         else:
-            return {"status": "unknown", "reason": "Location not specified for network check"}
+            return StepResult("unknown", "Location not specified for network check")
     
-    def _assess_medical_condition(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _assess_medical_condition(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Assess medical condition complexity"""
-        condition = parsed.get("medical_condition", "")
-        urgency = parsed.get("urgency", "normal")
+        condition = norm.medical_condition
         
-        if urgency == "high":
-            return {"status": "complex", "reason": "High urgency case requires special consideration"}
+        if norm.urgency == "high":
+            return StepResult("complex", "High urgency case requires special consideration")
         elif condition:
-            return {"status": "assessed", "reason": f"Medical condition {condition} evaluated"}
+            return StepResult("assessed", f"Medical condition {condition} evaluated")
         else:
-            return {"status": "standard", "reason": "No complex medical conditions identified"}
+            return StepResult("standard", "No complex medical conditions identified")
     
-    def _analyze_comorbidities(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _analyze_comorbidities(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Analyze comorbidities and their impact"""
-        condition = parsed.get("medical_condition", "")
+        condition = norm.medical_condition
         
         if condition:
-            return {"status": "analyzed", "reason": f"Comorbidities for {condition} evaluated"}
+            return StepResult("analyzed", f"Comorbidities for {condition} evaluated")
         else:
-            return {"status": "none", "reason": "No comorbidities identified"}
+            return StepResult("none", "No comorbidities identified")
     
-    def _evaluate_risk_factors(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _evaluate_risk_factors(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Evaluate risk factors"""
-        age = parsed.get("age")
-        condition = parsed.get("medical_condition", "")
-        
         risk_factors = []
-        if age and int(age) > 65:
+        if norm.age_int is not None and norm.age_int > 65:
             risk_factors.append("age")
-        if condition:
+        if norm.medical_condition:
             risk_factors.append("medical_condition")
         
         if risk_factors:
-            return {"status": "identified", "reason": f"Risk factors: {', '.join(risk_factors)}"}
+            return StepResult("identified", f"Risk factors: {', '.join(risk_factors)}")
         else:
-            return {"status": "low", "reason": "No significant risk factors identified"}
+            return StepResult("low", "No significant risk factors identified")
     
-    def _check_waiting_periods(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _check_waiting_periods(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Check waiting period requirements"""
-        duration = parsed.get("policy_duration", "")
-        procedure = parsed.get("procedure", "").lower()
-        
-        if duration and "month" in duration:
-            months = int(duration.split()[0])
-            if months < 3:
-                return {"status": "waiting", "reason": "Policy duration below waiting period requirement"}
+        if norm.months_int is not None and norm.months_int < 3:
+            return StepResult("waiting", "Policy duration below waiting period requirement")
         
-        return {"status": "eligible", "reason": "Waiting period requirements met"}
+        return StepResult("eligible", "Waiting period requirements met")
     
-    def _verify_exclusions(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _verify_exclusions(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Verify if any exclusions apply"""
-        procedure = parsed.get("procedure", "").lower()
-        condition = parsed.get("medical_condition", "").lower()
+        cosmetic = "cosmetic" in norm.procedure
+        pre_existing = "pre-existing" in norm.medical_condition_lc
         
-        exclusions = []
-        if "cosmetic" in procedure:
-            exclusions.append("cosmetic_procedure")
-        if "pre-existing" in condition:
-            exclusions.append("pre_existing_condition")
+        # Common case: nothing applies, so skip building the exclusion list
+        if not (cosmetic or pre_existing):
+            return StepResult("no_exclusions", "No exclusions identified")
         
-        if exclusions:
-            return {"status": "excluded", "reason": f"Exclusions apply: {', '.join(exclusions)}"}
-        else:
-            return {"status": "no_exclusions", "reason": "No exclusions identified"}
+        exclusions = [name for name, applies in (("cosmetic_procedure", cosmetic),
+                                                 ("pre_existing_condition", pre_existing)) if applies]
+        return StepResult("excluded", f"Exclusions apply: {', '.join(exclusions)}")
     
-    def _analyze_coverage_limits(self, parsed: Dict[str, Any], documents: List[Any]) -> Dict[str, Any]:
+    def _analyze_coverage_limits(self, norm: SimpleNamespace, documents: List[Any]) -> StepResult:
         """Analyze coverage limits and amounts"""
-        procedure = parsed.get("procedure", "").lower()
-        coverage_type = parsed.get("coverage_type", "basic")
-        
         # Define coverage limits based on procedure and coverage type
-        if "surgery" in procedure:
-            if coverage_type == "premium":
-                return {"status": "high_limit", "amount": "₹100000", "reason": "Premium coverage with high limits"}
+        if "surgery" in norm.procedure:
+            if norm.coverage_type == "premium":
+                return StepResult("high_limit", "Premium coverage with high limits", amount="₹100000")
             else:
-                return {"status": "standard_limit", "amount": "₹50000", "reason": "Standard coverage limits"}
+                return StepResult("standard_limit", "Standard coverage limits", amount="₹50000")
         else:
-            return {"status": "standard", "amount": "₹25000", "reason": "Standard coverage limits"}
+            return StepResult("standard", "Standard coverage limits", amount="₹25000")
     
-    def _evaluate_chain_decision(self, step_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _evaluate_chain_decision(self, step_results: Tuple[Tuple[str, StepResult], ...]) -> StepResult:
         """Evaluate the overall decision for a reasoning chain"""
-        # Count different statuses
-        status_counts = {}
-        for step in step_results:
-            status = step["result"].get("status", "unknown")
-            status_counts[status] = status_counts.get(status, 0) + 1
+        # Single pass in priority order: excluded > ineligible > restricted > eligible
+        ineligible = restricted = eligible = False
+        for _, result in step_results:
+            status = result.status
+            if status == "excluded":
+                return StepResult("excluded", "Chain contains exclusions")
+            elif status == "ineligible":
+                ineligible = True
+            elif status == "restricted":
+                restricted = True
+            elif status == "covered" or status == "eligible":
+                eligible = True
         
         # Determine overall chain decision
-        if "excluded" in status_counts:
-            return {"status": "excluded", "reason": "Chain contains exclusions"}
-        elif "ineligible" in status_counts:
-            return {"status": "ineligible", "reason": "Chain contains ineligibility"}
-        elif "restricted" in status_counts:
-            return {"status": "restricted", "reason": "Chain contains restrictions"}
-        elif "covered" in status_counts or "eligible" in status_counts:
-            return {"status": "eligible", "reason": "Chain indicates eligibility"}
+        if ineligible:
+            return StepResult("ineligible", "Chain contains ineligibility")
+        elif restricted:
+            return StepResult("restricted", "Chain contains restrictions")
+        elif eligible:
+            return StepResult("eligible", "Chain indicates eligibility")
         else:
-            return {"status": "conditional", "reason": "Chain requires further evaluation"}
+            return StepResult("conditional", "Chain requires further evaluation")
     
-    def _calculate_step_confidence(self, step_results: List[Dict[str, Any]]) -> float:
+    def _calculate_step_confidence(self, step_results: Tuple[Tuple[str, StepResult], ...]) -> float:
         """Calculate confidence score for a reasoning chain"""
         if not step_results:
             return 0.0
         
         # Calculate confidence based on step results
         total_steps = len(step_results)
-        confident_steps = sum(1 for step in step_results 
-                            if step["result"].get("status") in ["eligible", "covered", "no_exclusions"])
+        confident_steps = sum(1 for _, result in step_results 
+                            if result.status in ("eligible", "covered", "no_exclusions"))
         
         return confident_steps / total_steps
     
-    def _synthesize_results(self, chain_results: Dict[str, Any], query_context: Dict[str, Any]) -> Dict[str, Any]:
+    def _synthesize_results(self, chain_results: Dict[str, ChainResult], query_context: Dict[str, Any]) -> Dict[str, Any]:
         """Synthesize results from all reasoning chains"""
         if not chain_results:
             return {"status": "error", "reason": "No reasoning chains executed"}
         
-        # Collect all decisions
-        decisions = []
+        # Tally every chain decision in one pass
+        excluded = ineligible = restricted = False
+        all_eligible = True
+        supporting_chains = []
+        opposing_chains = []
         for chain_name, chain_result in chain_results.items():
-            decisions.append(chain_result["chain_decision"])
+            status = chain_result.chain_decision.status
+            if status == "eligible" or status == "covered":
+                supporting_chains.append(chain_name)
+                continue
+            all_eligible = False
+            if status == "excluded":
+                excluded = True
+                opposing_chains.append(chain_name)
+            elif status == "ineligible":
+                ineligible = True
+                opposing_chains.append(chain_name)
+            elif status == "restricted":
+                restricted = True
         
         # Determine final decision
-        if any(d["status"] == "excluded" for d in decisions):
+        if excluded:
             final_status = "rejected"
             reason = "Exclusions apply"
-        elif any(d["status"] == "ineligible" for d in decisions):
+        elif ineligible:
             final_status = "rejected"
             reason = "Eligibility requirements not met"
-        elif all(d["status"] in ["eligible", "covered"] for d in decisions):
+        elif all_eligible:
             final_status = "approved"
             reason = "All requirements met"
-        elif any(d["status"] == "restricted" for d in decisions):
+        elif restricted:
             final_status = "conditional"
             reason = "Some restrictions apply"
         else:
@@ -373,40 +465,38 @@ class MultiHopReasoner:
         return {
             "status": final_status,
             "reason": reason,
-            "supporting_chains": [name for name, result in chain_results.items() 
-                                if result["chain_decision"]["status"] in ["eligible", "covered"]],
-            "opposing_chains": [name for name, result in chain_results.items() 
-                              if result["chain_decision"]["status"] in ["excluded", "ineligible"]]
+            "supporting_chains": supporting_chains,
+            "opposing_chains": opposing_chains
         }
     
-    def _calculate_chain_confidence(self, chain_results: Dict[str, Any]) -> float:
+    def _calculate_chain_confidence(self, chain_results: Dict[str, ChainResult]) -> float:
         """Calculate overall confidence score"""
         if not chain_results:
             return 0.0
         
         total_confidence = 0.0
         for chain_result in chain_results.values():
-            total_confidence += chain_result.get("confidence", 0.0)
+            total_confidence += chain_result.confidence
         
         return total_confidence / len(chain_results)
     
-    def _generate_reasoning_path(self, chain_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_reasoning_path(self, chain_results: Dict[str, ChainResult]) -> List[Dict[str, Any]]:
         """Generate a human-readable reasoning path"""
         reasoning_path = []
         
         for chain_name, chain_result in chain_results.items():
             chain_path = {
                 "chain": chain_name,
-                "decision": chain_result["chain_decision"]["status"],
-                "reason": chain_result["chain_decision"]["reason"],
+                "decision": chain_result.chain_decision.status,
+                "reason": chain_result.chain_decision.reason,
                 "steps": []
             }
             
-            for step in chain_result["steps"]:
+            for step, result in chain_result.steps:
                 chain_path["steps"].append({
-                    "step": step["step"],
-                    "result": step["result"]["status"],
-                    "reason": step["result"]["reason"]
+                    "step": step,
+                    "result": result.status,
+                    "reason": result.reason
                 })
             
             reasoning_path.append(chain_path)
@@ -1,12 +1,18 @@
 import os, re
+import io
+import copy
+import hashlib
 import logging
+import threading
 import traceback
 import json
-from typing import Dict, Any, List
+import time
+import numpy as np
+from typing import Dict, Any, Iterator, List
 from src.utils.conv_mem import ConversationMemory
 from src.api.setup_api import logger
 from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
+from langchain.schema import SystemMessage, HumanMessage
 from .clause_extractor import EvidenceMapper
 from .enhanced_query_processor import EnhancedQueryProcessor
 from .multi_hop_reasoner import MultiHopReasoner
@@ -15,14 +21,85 @@ from src.utils.audit_trail import AuditTrail
 from .decision_explainer import DecisionExplainer
 from .optimizer import HackathonOptimizer
 
+# Currency symbol followed by an amount; group 1 is the digits with separators
+_AMOUNT_RE = re.compile(r'(?:₹|Rs\.?|INR|\$)\s?:?\s?(\d[\d,]*)')
+
+# Decision keyword groups, each compiled to one alternation so a check is a single scan
+_NEGATIVE_KEYWORDS = [
+    "not covered", "not eligible", "rejected", "excluded",
+    "declined", "denied", "not payable", "not admissible",
+    "claim denied", "claim rejected", "cannot be claimed",
+    "no coverage", "not claimable"
+]
+
+_POSITIVE_KEYWORDS = [
+    "covered", "eligible", "approved", "included",
+    "admissible", "payable", "reimbursable", "can be claimed",
+    "claim allowed", "claim approved", "claim accepted"
+]
+
+_UNCLEAR_KEYWORDS = [
+    "depends", "cannot determine", "unclear", "subject to",
+    "may be", "might be", "need more", "check with",
+    "conditional", "unsure", "ambiguous", "context not clear",
+    "insufficient info", "needs clarification"
+]
+
+_NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]+')
+_NEGATIVE_RE = re.compile("|".join(map(re.escape, _NEGATIVE_KEYWORDS)))
+_POSITIVE_RE = re.compile("|".join(map(re.escape, _POSITIVE_KEYWORDS)))
+_UNCLEAR_RE = re.compile("|".join(map(re.escape, _UNCLEAR_KEYWORDS)))
+
+# Decision labels in priority order; index doubles as the automaton payload
+_DECISION_LABELS = ("Rejected", "Approved", "Unclear")
+
+def _build_decision_automaton():
+    """Build one Aho-Corasick automaton over all decision keywords, if pyahocorasick is installed"""
+    try:
+        import ahocorasick
+    except ImportError:
+        logger.info("pyahocorasick not installed; using regex decision matching")
+        return None
+    
+    automaton = ahocorasick.Automaton()
+    for priority, keywords in enumerate((_NEGATIVE_KEYWORDS, _POSITIVE_KEYWORDS, _UNCLEAR_KEYWORDS)):
+        for keyword in keywords:
+            automaton.add_word(keyword, priority)
+    automaton.make_automaton()
+    return automaton
+
+_DECISION_AUTOMATON = _build_decision_automaton()
+
+# Approximate token budget for retrieved document text sent to the LLM
+_CONTEXT_TOKEN_BUDGET = 4000
+_CHARS_PER_TOKEN = 4
+
+# Entries kept in each of the retrieval and answer caches before the oldest is evicted
+_RESULT_CACHE_SIZE = 256
+
+# Optimizer decisions at or above this confidence are used without calling the LLM
+_LLM_BYPASS_CONFIDENCE = 0.8
+
+# Whole-response cache: entries expire after the TTL; semantic hits need this cosine similarity
+_RESPONSE_CACHE_TTL_SECONDS = 3600
+_SEMANTIC_CACHE_THRESHOLD = 0.9
+
 # -----------------------------
 # Enhanced QA Chain with Hackathon Optimization
 # -----------------------------
 class QAChain:
     """Handles question answering with retrieval, memory, and comprehensive analysis"""
     
+    __slots__ = (
+        "config", "memory", "evidence_mapper", "query_processor", "reasoner",
+        "consistency_validator", "audit_trail", "decision_explainer", "hackathon_optimizer",
+        "llm", "system_prompt_prefix", "_doc_cache", "_answer_cache", "_cache_lock",
+        "_response_cache", "_semantic_cache", "debug"
+    )
+    
     def __init__(self, config: Dict[str, str]):
         self.config = config
+        self.debug = str(config.get('DEBUG', '')).lower() in ('1', 'true', 'yes')
         self.memory = ConversationMemory()
         self.evidence_mapper = EvidenceMapper()
         self.query_processor = EnhancedQueryProcessor()
@@ -39,77 +116,151 @@ class QAChain:
             temperature=0.1
         )
         
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", (
-                "You are a helpful assistant that answers questions based on the provided context. "
-                "Use only the information from the context to answer questions. "
-                "If you cannot find the answer in the context, reply with 'I don't know based on the provided documents.' "
-                "Mention your decision clearly if applicable and also the amount to be given if at all it's there."
-                "Be concise but comprehensive in your answers.\n\n"
-                "Context: {context}"
-            )),
-            ("human", "{question}")
-        ])
+        # Static system prompt; only the context is appended per request
+        self.system_prompt_prefix = (
+            "You are a helpful assistant that answers questions based on the provided context. "
+            "Use only the information from the context to answer questions. "
+            "If you cannot find the answer in the context, reply with 'I don't know based on the provided documents.' "
+            "Mention your decision clearly if applicable and also the amount to be given if at all it's there."
+            "Be concise but comprehensive in your answers.\n\n"
+            "Context: "
+        )
+        
+        # Repeated questions skip retrieval and the LLM; FIFO-evicted, dropped on re-ingestion
+        self._doc_cache = {}     # (session_id, k, query) -> retrieved documents
+        self._answer_cache = {}  # (context digest, question) -> LLM answer
+        self._cache_lock = threading.Lock()
+        
+        # Whole-pipeline caches for repeated questions, scoped per session since retrieval is
+        self._response_cache = {}   # (session_id, question) -> (created_at, response)
+        self._semantic_cache = []   # [session_id, entities_key, embedding, response, created_at]
         
         logger.info("Enhanced QA Chain with hackathon optimization initialized")
     
+    def invalidate(self, session_id: str = None):
+        """Drop cached retrievals (for one session, or all) and cached answers"""
+        with self._cache_lock:
+            if session_id is None:
+                self._doc_cache.clear()
+            else:
+                for key in [key for key in self._doc_cache if key[0] == session_id]:
+                    del self._doc_cache[key]
+            self._answer_cache.clear()
+            if session_id is None:
+                self._response_cache.clear()
+                self._semantic_cache.clear()
+            else:
+                for key in [key for key in self._response_cache if key[0] == session_id]:
+                    del self._response_cache[key]
+                self._semantic_cache = [entry for entry in self._semantic_cache if entry[0] != session_id]
+    
+    def _cache_put(self, cache: Dict, key: tuple, value: Any):
+        """Store a cache entry, evicting the oldest one when full"""
+        with self._cache_lock:
+            if key not in cache and len(cache) >= _RESULT_CACHE_SIZE:
+                del cache[next(iter(cache))]
+            cache[key] = value
+    
+    def _embed_question(self, retriever, question: str):
+        """Embed a query with the retriever's own embedder, or None if it has none"""
+        embeddings = getattr(getattr(retriever, 'vectorstore', None), 'embeddings', None)
+        if embeddings is None:
+            return None
+        vector = np.asarray(embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def _get_cached_response(self, session_id: str, question: str):
+        """Find a cached response for an identical question"""
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._response_cache.pop((session_id, question), None)
+            if cached is not None and now - cached[0] < _RESPONSE_CACHE_TTL_SECONDS:
+                # Re-insert to mark as most recently used
+                self._response_cache[(session_id, question)] = cached
+                return cached[1]
+            return None
+    
+    def _get_semantic_response(self, session_id: str, entities_key: tuple, vector):
+        """Find a cached response for a semantically equivalent question"""
+        if vector is None:
+            return None
+        now = time.monotonic()
+        with self._cache_lock:
+            # Near-duplicates only count when the decision-relevant entities match exactly
+            self._semantic_cache = [entry for entry in self._semantic_cache
+                                    if now - entry[4] < _RESPONSE_CACHE_TTL_SECONDS]
+            best_index, best_score = None, _SEMANTIC_CACHE_THRESHOLD
+            for index, entry in enumerate(self._semantic_cache):
+                if entry[0] == session_id and entry[1] == entities_key:
+                    score = float(np.dot(entry[2], vector))
+                    if score >= best_score:
+                        best_index, best_score = index, score
+            if best_index is None:
+                return None
+            
+            # Move to the end to mark as most recently used
+            best = self._semantic_cache.pop(best_index)
+            self._semantic_cache.append(best)
+            return best[3]
+    
+    def _store_cached_response(self, session_id: str, question: str, entities_key: tuple, vector, response: Dict[str, Any]):
+        """Remember a pipeline response for exact and semantic reuse"""
+        # Private copy: callers post-process the response they were handed
+        response = copy.deepcopy(response)
+        now = time.monotonic()
+        self._cache_put(self._response_cache, (session_id, question), (now, response))
+        if vector is None:
+            return
+        with self._cache_lock:
+            self._semantic_cache.append([session_id, entities_key, vector, response, now])
+            if len(self._semantic_cache) > _RESULT_CACHE_SIZE:
+                del self._semantic_cache[0]
+    
+    def _retrieve(self, retriever, query: str, session_id: str) -> List[Any]:
+        """Retrieve documents, reusing the result for a repeated query in the same session"""
+        # Retrievers are rebuilt per request, so key on what they search rather than their identity
+        k = getattr(retriever, 'search_kwargs', {}).get('k')
+        key = (session_id, k, query)
+        docs = self._doc_cache.get(key)
+        if docs is None:
+            docs = retriever.get_relevant_documents(query)
+            self._cache_put(self._doc_cache, key, docs)
+        return list(docs)
+    
     def _extract_decision(self, answer: str) -> str:
-        ans = answer.lower()
-
         # Normalize spaces, remove special characters for better matching
-        ans_clean = re.sub(r'[^a-zA-Z\s]', '', ans)
+        ans_clean = _NON_ALPHA_RE.sub('', answer.lower())
 
-        negative_keywords = [
-            "not covered", "not eligible", "rejected", "excluded",
-            "declined", "denied", "not payable", "not admissible",
-            "claim denied", "claim rejected", "cannot be claimed",
-            "no coverage", "not claimable"
-        ]
+        if _DECISION_AUTOMATON is not None:
+            # One linear pass matches every keyword; keep the highest-priority label seen
+            best = len(_DECISION_LABELS)
+            for _, priority in _DECISION_AUTOMATON.iter(ans_clean):
+                if priority < best:
+                    best = priority
+                    if best == 0:
+                        break
+            return _DECISION_LABELS[best] if best < len(_DECISION_LABELS) else "Unknown"
 
-        positive_keywords = [
-            "covered", "eligible", "approved", "included",
-            "admissible", "payable", "reimbursable", "can be claimed",
-            "claim allowed", "claim approved", "claim accepted"
-        ]
+        # Negative keywords take priority over positive, positive over unclear
+        if _NEGATIVE_RE.search(ans_clean):
+            return "Rejected"
 
-        unclear_keywords = [
-            "depends", "cannot determine", "unclear", "subject to",
-            "may be", "might be", "need more", "check with",
-            "conditional", "unsure", "ambiguous", "context not clear",
-            "insufficient info", "needs clarification"
-        ]
+        if _POSITIVE_RE.search(ans_clean):
+            return "Approved"
 
-        for kw in negative_keywords:
-            if kw in ans_clean:
-                return "Rejected"
-
-        for kw in positive_keywords:
-            if kw in ans_clean:
-                return "Approved"
-
-        for kw in unclear_keywords:
-            if kw in ans_clean:
-                return "Unclear"
+        if _UNCLEAR_RE.search(ans_clean):
+            return "Unclear"
 
         return "Unknown"
 
     def _extract_amount(self, answer: str) -> str:
-        # Match ₹, Rs., or $ followed by numbers (with optional spaces and commas)
-        matches = re.findall(r'(₹|Rs\.?|INR|\$)\s?:?\s?\d[\d,]*', answer)
-
-        if not matches:
+        # Match ₹, Rs., INR or $ followed by numbers (with optional spaces and commas)
+        match = _AMOUNT_RE.search(answer)
+        if not match:
             return "N/A"
 
-        # Clean up and extract numeric part
-        for raw in matches:
-            # Remove symbols and punctuation
-            num_match = re.search(r'\d[\d,]*', raw)
-            if num_match:
-                amount = num_match.group(0).replace(",", "")
-                if amount.isdigit():
-                    return f"₹{amount}"
-
-        return "N/A"
+        return f"₹{match.group(1).replace(',', '')}"
  
     def run(self, question: str, retriever, session_id: str, user_id: str = "default_user") -> Dict[str, Any]:
         """Process question and return structured response with comprehensive analysis"""
@@ -131,22 +282,41 @@ class QAChain:
             query_analysis = self.query_processor.process_query(question)
             logger.info(f"Query analysis completed: {query_analysis['processing_metadata']['entities_found']} entities found")
             
+            # Repeated or near-duplicate question: skip retrieval, reasoning and the LLM
+            entities_key = tuple(sorted(
+                (key, str(value)) for key, value in query_analysis.get('parsed_entities', {}).items()
+            ))
+            question_vector = None
+            cached_response = self._get_cached_response(session_id, question)
+            
+            # Use expanded query terms for better retrieval
+            expanded_terms = query_analysis.get('expanded_query', {}).get('expanded_terms', [])
+            retrieval_query = f"{question} {' '.join(expanded_terms)}" if expanded_terms else question
+            
+            if cached_response is None:
+                # Embed the retrieval query itself: the vector drives the semantic lookup, and the
+                # embedder's query cache hands the same vector to the retriever on a miss
+                try:
+                    question_vector = self._embed_question(retriever, retrieval_query)
+                except Exception as e:
+                    logger.warning(f"Question embedding failed, semantic cache skipped: {e}")
+                cached_response = self._get_semantic_response(session_id, entities_key, question_vector)
+            if cached_response is not None:
+                return self._replay_cached_response(
+                    cached_response, question, query_analysis, session_id, user_id
+                )
+            
             # Step 2: Retrieve relevant documents
             docs = []
+            # Set when retrieval or the LLM fails; such answers are served but never cached
+            degraded = False
             try:
-                # Use expanded query terms for better retrieval
-                expanded_terms = query_analysis.get('expanded_query', {}).get('expanded_terms', [])
-                if expanded_terms:
-                    # Create enhanced query with expanded terms
-                    enhanced_query = f"{question} {' '.join(expanded_terms)}"
-                    docs = retriever.get_relevant_documents(enhanced_query)
-                else:
-                    docs = retriever.get_relevant_documents(question)
-                
+                docs = self._retrieve(retriever, retrieval_query, session_id)
                 logger.info(f"Retrieved {len(docs)} documents for question")
             except Exception as e:
                 logger.error(f"Document retrieval failed: {e}")
                 self.audit_trail.log_error(session_id, user_id, "retrieval_error", str(e), {"question": question})
+                degraded = True
             
             # Step 3: Multi-hop reasoning
             reasoning_result = self.reasoner.execute_reasoning_chain(query_analysis, docs)
@@ -157,30 +327,41 @@ class QAChain:
             # hackathon_response = self.hackathon_optimizer.process_query(question, document_texts)
             hackathon_response = {"decision": {"status": "unclear", "confidence": 0.0}}
 
-            # Step 5: Generate LLM answer with enhanced context (fallback)
-            context = self._prepare_enhanced_context(docs, query_analysis, reasoning_result)
+            hackathon_decision = hackathon_response.get('decision', {})
+            use_hackathon = hackathon_decision.get('status') != 'unclear'
             
-            try:
-                formatted_prompt = self.prompt.format_prompt(
-                    context=context, 
-                    question=question
-                )
+            # Step 5: Generate LLM answer with enhanced context (fallback)
+            if (use_hackathon and 'justification' in hackathon_response
+                    and hackathon_decision.get('confidence', 0.0) >= _LLM_BYPASS_CONFIDENCE):
+                # Confident optimizer answer: skip the context build and the Groq round trip
+                llm_answer = hackathon_response['justification']
+            else:
+                context = self._prepare_enhanced_context(docs, query_analysis, reasoning_result)
                 
-                response = self.llm.invoke(formatted_prompt.to_messages())
-                llm_answer = response.content
+                answer_key = (hashlib.blake2b(context.encode(), digest_size=16).digest(), question)
+                try:
+                    llm_answer = self._answer_cache.get(answer_key)
+                    if llm_answer is None:
+                        response = self.llm.invoke([
+                            SystemMessage(content=self.system_prompt_prefix + context),
+                            HumanMessage(content=question)
+                        ])
+                        llm_answer = response.content
+                        self._cache_put(self._answer_cache, answer_key, llm_answer)
 
-            except Exception as e:
-                logger.error(f"LLM generation failed: {e}")
-                self.audit_trail.log_error(session_id, user_id, "llm_error", str(e), {"question": question})
-                llm_answer = "I apologize, but I encountered an error while generating the answer. Please try again."
+                except Exception as e:
+                    logger.error(f"LLM generation failed: {e}")
+                    self.audit_trail.log_error(session_id, user_id, "llm_error", str(e), {"question": question})
+                    llm_answer = "I apologize, but I encountered an error while generating the answer. Please try again."
+                    degraded = True
             
             # Step 6: Use hackathon response if available, otherwise fallback to LLM
-            if hackathon_response.get('decision', {}).get('status') != 'unclear':
+            if use_hackathon:
                 # Use hackathon optimizer response
                 answer = hackathon_response.get('justification', llm_answer)
-                decision = hackathon_response.get('decision', {}).get('status', 'unclear')
-                amount = hackathon_response.get('decision', {}).get('amount', 'N/A')
-                confidence = hackathon_response.get('decision', {}).get('confidence', 0.0)
+                decision = hackathon_decision.get('status', 'unclear')
+                amount = hackathon_decision.get('amount', 'N/A')
+                confidence = hackathon_decision.get('confidence', 0.0)
             else:
                 # Fallback to LLM processing
                 answer = llm_answer
@@ -188,11 +369,11 @@ class QAChain:
                 amount = self._extract_amount(answer)
                 confidence = 0.7  # Default confidence for LLM responses
             
-            # Add AI response to memory
-            self.memory.add_message(session_id, 'assistant', answer)
+            # Add AI response to memory and keep the updated history for the response
+            history = self.memory.append_and_get(session_id, [('assistant', answer)])
             
             # Step 7: Create structured response with enhanced information
-            if hackathon_response.get('decision', {}).get('status') != 'unclear':
+            if use_hackathon:
                 # Use hackathon structured response
                 structured_response = {
                     "question": question,
@@ -239,13 +420,10 @@ class QAChain:
             )
             
             # Add retrieved documents to the response for debugging
-            enhanced_response['retrieved_documents'] = [
-                {
-                    'content': doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                    'metadata': doc.metadata,
-                    'source': doc.metadata.get('source', 'Unknown')
-                } for doc in docs
-            ]
+            if self.debug:
+                enhanced_response['retrieved_documents'] = [
+                    self._summarize_document(doc) for doc in docs
+                ]
             
             # Step 11: Log decision to audit trail
             audit_id = self.audit_trail.log_decision(
@@ -266,8 +444,8 @@ class QAChain:
                 "confidence": enhanced_response.get('decision', {}).get('confidence', 0.0)
             })
             
-            # Create backward-compatible response for existing interface
-            legacy_response = {
+            # Backward-compatible fields for the existing interface, followed by the enhanced analysis
+            combined_response = {
                 "decision": decision,
                 "amount": amount,
                 "justification": answer.strip(),
@@ -277,22 +455,20 @@ class QAChain:
                     "enhanced_analysis": query_analysis
                 },
                 "answer": answer,
-                "history": self.memory.get_history(session_id)
-            }
-            
-            # Combine both responses
-            combined_response = {
-                **legacy_response,
+                "history": history,
                 "structured_response": enhanced_response,
-                "json_output": json.dumps(enhanced_response, indent=2),
+                "json_output": enhanced_response,
                 "query_analysis": query_analysis,
                 "reasoning_result": reasoning_result,
                 "consistency_validation": consistency_validation,
                 "decision_explanation": decision_explanation,
                 "audit_id": audit_id,
-                "hackathon_optimized": hackathon_response.get('decision', {}).get('status') != 'unclear'
+                "hackathon_optimized": use_hackathon
             }
             
+            if not degraded:
+                self._store_cached_response(session_id, question, entities_key, question_vector, combined_response)
+            
             return combined_response
 
             
@@ -305,14 +481,84 @@ class QAChain:
                 'structured_response': None
             }
     
+    def _replay_cached_response(self, 
+                                cached_response: Dict[str, Any], 
+                                question: str, 
+                                query_analysis: Dict[str, Any], 
+                                session_id: str, 
+                                user_id: str) -> Dict[str, Any]:
+        """Serve a cached response while still recording the turn in memory and the audit trail"""
+        response = copy.deepcopy(cached_response)
+        response['history'] = self.memory.append_and_get(session_id, [('assistant', response['answer'])])
+        response['query_details'] = {
+            "interpreted_from": question,
+            "enhanced_analysis": query_analysis
+        }
+        response['query_analysis'] = query_analysis
+        
+        # A semantic hit was cached for a different wording; describe this question, not that one.
+        # json_output is the same dict as structured_response, so both are updated
+        structured = response['structured_response']
+        if 'question' in structured:
+            structured['question'] = question
+        if 'query' in structured:
+            structured['query'] = {
+                "original": question,
+                "parsed": self.evidence_mapper._parse_query_structure(question)
+            }
+        structured['query_analysis'] = self._summarize_query_analysis(query_analysis)
+        
+        response['audit_id'] = self.audit_trail.log_decision(
+            session_id=session_id,
+            user_id=user_id,
+            query=question,
+            decision=response['structured_response'].get('decision', {}),
+            query_context=query_analysis,
+            reasoning_result=response['reasoning_result'],
+            consistency_validation=response['consistency_validation']
+        )
+        self.audit_trail.log_activity(session_id, user_id, "query_completed", {
+            "audit_id": response['audit_id'],
+            "decision": response['decision'],
+            "amount": response['amount'],
+            "confidence": response['structured_response'].get('decision', {}).get('confidence', 0.0),
+            "cache_hit": True
+        })
+        logger.info("Served answer from response cache")
+        return response
+    
+    def _summarize_document(self, doc: Any) -> Dict[str, Any]:
+        """Build the truncated debug preview of a retrieved document"""
+        content = doc.page_content
+        metadata = doc.metadata
+        return {
+            'content': content[:200] + "..." if len(content) > 200 else content,
+            'metadata': metadata,
+            'source': metadata.get('source', 'Unknown')
+        }
+    
+    def _select_context_docs(self, docs: List[Any]) -> List[str]:
+        """Keep the most relevant document texts that fit in the context token budget"""
+        kept = []
+        used = 0
+        for doc in docs:
+            text = doc.page_content
+            tokens = len(text) // _CHARS_PER_TOKEN
+            remaining = _CONTEXT_TOKEN_BUDGET - used
+            if tokens > remaining:
+                # Clip the boundary document to the budget that is left, then stop
+                if remaining > 0:
+                    kept.append(text[:remaining * _CHARS_PER_TOKEN])
+                break
+            kept.append(text)
+            used += tokens
+        return kept
+    
     def _prepare_enhanced_context(self, 
                                  docs: List[Any], 
                                  query_analysis: Dict[str, Any], 
                                  reasoning_result: Dict[str, Any]) -> str:
         """Prepare enhanced context with query analysis and reasoning information"""
-        # Basic document context
-        doc_context = "\n---\n".join([doc.page_content for doc in docs])
-        
         # Add query analysis context
         parsed = query_analysis.get('parsed_entities', {})
         query_context = f"""
@@ -330,43 +576,48 @@ Validation: {query_analysis.get('validation', {}).get('is_valid', False)}
 Confidence: {query_analysis.get('processing_metadata', {}).get('confidence_score', 0.0):.2f}
 """
         
+        # Write every part straight into one buffer instead of building intermediate strings
+        buf = io.StringIO()
+        buf.write(query_context)
+        buf.write("\n")
+        
         # Add reasoning context
-        reasoning_context = ""
         if reasoning_result.get('reasoning_chains'):
-            reasoning_context = "\nReasoning Analysis:\n"
+            buf.write("\nReasoning Analysis:\n")
             for chain_name, chain_result in reasoning_result['reasoning_chains'].items():
                 decision = chain_result.get('chain_decision', {})
-                reasoning_context += f"- {chain_name}: {decision.get('status', 'unknown')} - {decision.get('reason', 'No reason provided')}\n"
+                buf.write(f"- {chain_name}: {decision.get('status', 'unknown')} - {decision.get('reason', 'No reason provided')}\n")
         
-        # Combine all context
-        enhanced_context = f"{query_context}\n{reasoning_context}\n\nDocument Context:\n{doc_context}"
+        # Basic document context, in retrieval (relevance) order up to the token budget
+        buf.write("\n\nDocument Context:\n")
+        for i, text in enumerate(self._select_context_docs(docs)):
+            if i:
+                buf.write("\n---\n")
+            buf.write(text)
         
-        return enhanced_context
+        return buf.getvalue()
     
     def _enhance_structured_response(self, 
                                    structured_response: Dict[str, Any], 
                                    query_analysis: Dict[str, Any], 
                                    reasoning_result: Dict[str, Any],
                                    consistency_validation: Dict[str, Any],
-                                   decision_explanation: Dict[str, Any]) -> Dict[str, Any]:
+                                   decision_explanation: Dict[str, Any],
+                                   mutate: bool = True) -> Dict[str, Any]:
         """Enhance structured response with all analysis information"""
-        enhanced = structured_response.copy()
+        # run() builds structured_response fresh per request, so it can be extended in place
+        enhanced = structured_response if mutate else structured_response.copy()
+        final_decision = reasoning_result.get('final_decision') or {}
         
         # Add query analysis
-        enhanced['query_analysis'] = {
-            'parsed_entities': query_analysis.get('parsed_entities', {}),
-            'validation': query_analysis.get('validation', {}),
-            'expanded_query': query_analysis.get('expanded_query', {}),
-            'disambiguated': query_analysis.get('disambiguated', {}),
-            'processing_metadata': query_analysis.get('processing_metadata', {})
-        }
+        enhanced['query_analysis'] = self._summarize_query_analysis(query_analysis)
         
         # Add reasoning information
         enhanced['reasoning'] = {
             'final_decision': reasoning_result.get('final_decision', {}),
             'confidence_score': reasoning_result.get('confidence_score', 0.0),
             'reasoning_path': reasoning_result.get('reasoning_path', []),
-            'active_chains': list(reasoning_result.get('reasoning_chains', {}).keys())
+            'active_chains': list(reasoning_result.get('reasoning_chains', {}))
         }
         
         # Add consistency validation
@@ -376,19 +627,34 @@ Confidence: {query_analysis.get('processing_metadata', {}).get('confidence_score
         enhanced['decision_explanation'] = decision_explanation
         
         # Enhance decision with reasoning
-        if reasoning_result.get('final_decision'):
-            final_decision = reasoning_result['final_decision']
-            enhanced['decision']['status'] = final_decision.get('status', enhanced['decision']['status'])
-            enhanced['decision']['reasoning'] = final_decision.get('reason', 'No reasoning provided')
-            enhanced['decision']['supporting_chains'] = final_decision.get('supporting_chains', [])
-            enhanced['decision']['opposing_chains'] = final_decision.get('opposing_chains', [])
+        if final_decision:
+            decision = enhanced['decision']
+            decision['status'] = final_decision.get('status', decision['status'])
+            decision['reasoning'] = final_decision.get('reason', 'No reasoning provided')
+            decision['supporting_chains'] = final_decision.get('supporting_chains', [])
+            decision['opposing_chains'] = final_decision.get('opposing_chains', [])
         
         return enhanced
     
+    @staticmethod
+    def _summarize_query_analysis(query_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """The query analysis fields embedded in a structured response"""
+        return {
+            'parsed_entities': query_analysis.get('parsed_entities', {}),
+            'validation': query_analysis.get('validation', {}),
+            'expanded_query': query_analysis.get('expanded_query', {}),
+            'disambiguated': query_analysis.get('disambiguated', {}),
+            'processing_metadata': query_analysis.get('processing_metadata', {})
+        }
+    
     def get_audit_trail(self, session_id: str = None, user_id: str = None, **kwargs) -> List[Dict[str, Any]]:
         """Get audit trail for the session"""
         return self.audit_trail.get_audit_trail(session_id=session_id, user_id=user_id, **kwargs)
     
+    def iter_audit_trail(self, session_id: str = None, user_id: str = None, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the audit trail for the session"""
+        return self.audit_trail.iter_audit_trail(session_id=session_id, user_id=user_id, **kwargs)
+    
     def get_decision_history(self, session_id: str = None, user_id: str = None, **kwargs) -> List[Dict[str, Any]]:
         """Get decision history for the session"""
         return self.audit_trail.get_decision_history(session_id=session_id, user_id=user_id, **kwargs)
@@ -1,11 +1,46 @@
 import re
+import functools
 import spacy
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+from src.api.setup_api import logger
+
+_AGE_RE = re.compile(r'(\d{1,3})\s*(year[- ]?old|yrs?|y/o|age)?')
+_GENDER_RE = re.compile(r'\b(male|female|m\b|f\b)\b')
+_DURATION_RE = re.compile(r'(\d{1,2})\s*[- ]?(month|months|year|years)\b')
+
+# Only entities and noun chunks are read, so the lemmatizer is dead weight;
+# tok2vec/tagger/attribute_ruler stay because the parser and POS-based noun chunks depend on them
+_DISABLED_PIPES = ("lemmatizer",)
+_LOCATION_LABELS = ("GPE", "LOC", "FAC")
+
+@functools.lru_cache(maxsize=None)
+def _load_nlp(name: str):
+    """Load a spaCy pipeline once per process and share it across interpreters"""
+    return spacy.load(name, disable=list(_DISABLED_PIPES))
+
+def _build_procedure_automaton(procedure_keywords: Dict[str, List[str]]):
+    """Build one Aho-Corasick automaton over all procedure aliases, if pyahocorasick is installed"""
+    try:
+        import ahocorasick
+    except ImportError:
+        logger.info("pyahocorasick not installed; using substring procedure matching")
+        return None
+
+    automaton = ahocorasick.Automaton()
+    # Payload keeps the table position so the earliest-listed procedure still wins
+    for priority, (proc, aliases) in enumerate(procedure_keywords.items()):
+        for alias in aliases:
+            automaton.add_word(alias, (priority, proc))
+    automaton.make_automaton()
+    return automaton
 
 class QueryInterpreter:
-    def __init__(self):
-        # self.nlp = spacy.load("en_core_web_sm")
-        self.nlp = spacy.load("en_core_web_trf")
+    def __init__(self, location_fallback: bool = False):
+        self.nlp = _load_nlp("en_core_web_sm")
+
+        # Transformer model is only loaded (lazily) when opted in, for queries where sm finds no location
+        self.location_fallback = location_fallback
+        self._trf_nlp = None
 
         self.procedure_keywords = {
             "knee replacement": ["knee replacement", "knee surgery", "knee operation"],
@@ -20,6 +55,7 @@ class QueryInterpreter:
             "abortion": ["abortion", "medical termination", "mtp", "ectopic pregnancy"],
             "cosmetic": ["rhinoplasty", "nose job", "cosmetic surgery", "plastic surgery"],
         }
+        self._procedure_automaton = _build_procedure_automaton(self.procedure_keywords)
 
     def parse(self, query: str) -> Dict[str, Optional[str]]:
         query = query.lower().strip()
@@ -34,7 +70,7 @@ class QueryInterpreter:
         }
 
         # --- AGE --- (only if tied to "year" or "age")
-        age_match = re.search(r'(\d{1,3})\s*(year[- ]?old|yrs?|y/o|age)?', query)
+        age_match = _AGE_RE.search(query)
         if age_match:
             keyword = age_match.group(2)
             age = int(age_match.group(1))
@@ -42,31 +78,24 @@ class QueryInterpreter:
                 parsed["age"] = str(age)
 
         # --- GENDER ---
-        gender_match = re.search(r'\b(male|female|m\b|f\b)\b', query)
+        gender_match = _GENDER_RE.search(query)
         if gender_match:
             g = gender_match.group(1)
             parsed["gender"] = "M" if g.startswith("m") else "F"
 
         # --- POLICY DURATION ---
-        dur_match = re.search(r'(\d{1,2})\s*[- ]?(month|months|year|years)\b', query)
+        dur_match = _DURATION_RE.search(query)
         if dur_match:
             value, unit = dur_match.groups()
             parsed["policy_duration"] = f"{value} {unit}"
 
         # --- LOCATION --- (Named Entities)
-        for ent in doc.ents:
-            if ent.label_ in ("GPE", "LOC", "FAC"):  # Geo-political entity
-                parsed["location"] = ent.text.title()
-                break
+        parsed["location"] = self._find_location(doc)
+        if parsed["location"] is None and self.location_fallback:
+            parsed["location"] = self._find_location(self._get_trf_nlp()(query))
 
         # --- PROCEDURE --- (extract medical/noun phrase)
-        for proc, aliases in self.procedure_keywords.items():
-            for alias in aliases:
-                if alias in query:
-                    parsed["procedure"] = proc.title()
-                    break
-            if parsed["procedure"]:
-                break
+        parsed["procedure"] = self._match_procedure(query)
 
         # --- PROCEDURE fallback: longest noun chunk with medical words
         if not parsed["procedure"]:
@@ -79,3 +108,27 @@ class QueryInterpreter:
                 parsed["procedure"] = max(noun_phrases, key=len).replace("my ", "").strip().title()
 
         return parsed
+
+    def _find_location(self, doc) -> Optional[str]:
+        """Return the first geo-political, location or facility entity"""
+        for ent in doc.ents:
+            if ent.label_ in _LOCATION_LABELS:
+                return ent.text.title()
+        return None
+
+    def _get_trf_nlp(self):
+        """Load the transformer model on first use"""
+        if self._trf_nlp is None:
+            self._trf_nlp = _load_nlp("en_core_web_trf")
+        return self._trf_nlp
+
+    def _match_procedure(self, query: str) -> Optional[str]:
+        """Return the first-listed procedure with an alias in the query"""
+        if self._procedure_automaton is not None:
+            matches = [payload for _, payload in self._procedure_automaton.iter(query)]
+            return min(matches)[1].title() if matches else None
+
+        for proc, aliases in self.procedure_keywords.items():
+            if any(alias in query for alias in aliases):
+                return proc.title()
+        return None
@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 from datetime import datetime
@@ -7,6 +8,31 @@ from pinecone import Pinecone
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+# Distinct query strings whose embeddings are kept in memory
+_QUERY_EMBEDDING_CACHE_SIZE = 10000
+
+# -----------------------------
+# Query Embedding Cache
+# -----------------------------
+class CachedQueryEmbeddings(Embeddings):
+    """Wraps an embedder so repeated query strings are only encoded once"""
+    
+    def __init__(self, embeddings: Embeddings, maxsize: int = _QUERY_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self._embed_query = functools.lru_cache(maxsize=maxsize)(self._encode_query)
+    
+    def _encode_query(self, text: str) -> tuple:
+        # Stored as a tuple so a caller mutating its copy cannot corrupt the cache
+        return tuple(self.embeddings.embed_query(text))
+    
+    def embed_query(self, text: str) -> List[float]:
+        return list(self._embed_query(text))
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Document chunks are embedded once at ingestion, so they bypass the cache
+        return self.embeddings.embed_documents(texts)
 
 # -----------------------------
 # Vector Store Handler
@@ -28,12 +54,12 @@ class VectorStore:
             index_name = self.config['PINECONE_INDEX']
             
             # ✅ Initialize embeddings first (before index creation)
-            self.embeddings = HuggingFaceEmbeddings(
+            self.embeddings = CachedQueryEmbeddings(HuggingFaceEmbeddings(
                 model_name=self.config['EMBED_MODEL'],
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True},
                 cache_folder='./models'
-            )
+            ))
 
             # ✅ Get embedding dimension before using it
             dimension = int(self.config.get("EMBED_DIMENSION", len(self.embeddings.embed_query("test"))))
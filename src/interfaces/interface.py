@@ -1,15 +1,186 @@
+import asyncio
+import functools
+import hashlib
+import html
+import os
+import string
+import stat
+import threading
+import time
 import traceback
 import uuid
-import json
-import pandas as pd
+import orjson
 import requests
 from datetime import datetime, timedelta
 from src.api.setup_api import APIKeyManager, logger
 from src.utils.file_processing import FileProcessor
 from src.core.text_processing import TextProcessor
+from src.core.clause_extractor import EvidenceMapper
 from src.utils.app_state import app_state
+from src.utils.cache_manager import CacheManager
 import gradio as gr
 
+# -----------------------------
+# Static UI Content
+# -----------------------------
+# gr.File requires a list, so this is shared rather than a tuple
+_SUPPORTED_FILE_TYPES = [".pdf", ".txt", ".docx", ".doc", ".eml", ".msg", ".png", ".jpg", ".jpeg"]
+
+_HEADER_MD = """
+# 🚀 Advanced Document Q&A Assistant
+### Intelligent Document Analysis with Advanced Analytics & Monitoring
+
+*Powered by RAG, Multi-Hop Reasoning, and Real-time Analytics*
+"""
+
+_OPTIMIZATION_TIPS_MD = """
+**💡 Query Optimization Tips:**
+
+1. **Be Specific**: Include age, gender, procedure details
+2. **Add Context**: Mention location, policy duration
+3. **Use Keywords**: Include medical terms and procedures
+4. **Be Clear**: Avoid ambiguous language
+5. **Include Details**: Add urgency, severity if applicable
+
+**Example Good Queries:**
+- "46-year-old male, knee surgery in Pune, 3-month policy"
+- "Female patient, 35 years old, cataract surgery in Mumbai"
+- "Angioplasty procedure for 50-year-old male, urgent case"
+"""
+
+_INSTRUCTIONS_MD = """
+## 🚀 Advanced Features Guide
+
+### 📁 Document Upload
+1. **Supported Formats**: PDF, TXT, DOCX, DOC, EML, MSG, Images (PNG, JPG, JPEG)
+2. **Enable OCR** for image files if needed
+3. **Click Process & Index** to extract knowledge
+
+### 💬 Query Interface
+1. **Ask Questions** in natural language
+2. **View Results** in Answer, Decision Summary, and Debug tabs
+3. **Use Templates** for common query patterns
+
+### ⚡ Batch Processing
+1. **Enter Multiple Queries** (one per line)
+2. **Process All at Once** for efficiency
+3. **View Results** in organized table format
+
+### 📊 Analytics & Monitoring
+1. **Monitor Performance** with real-time metrics
+2. **View Cache Statistics** for optimization
+3. **Browse Audit Trail** for decision history
+
+### ⚙️ Configuration
+1. **Update API Keys** as needed
+2. **Configure Model Parameters** for optimal performance
+3. **Set Up Webhooks** for external integrations
+4. **Manage Rate Limits** for system stability
+
+### 🔒 GDPR & Security
+1. **Export User Data** for compliance
+2. **Delete User Data** when requested
+3. **Monitor Security Status** continuously
+"""
+
+# -----------------------------
+# Batch Results HTML Templates
+# -----------------------------
+_BATCH_TABLE_HEAD = """
+        <div style="margin: 20px 0;">
+            <h3>📊 Batch Processing Results</h3>
+            <table style="width: 100%; border-collapse: collapse; margin-top: 10px;">
+                <thead>
+                    <tr style="background-color: #f0f0f0;">
+                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Query</th>
+                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Decision</th>
+                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Amount</th>
+                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Confidence</th>
+                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Status</th>
+                    </tr>
+                </thead>
+                <tbody>
+        """
+
+_BATCH_ROW_TEMPLATE = string.Template("""
+                    <tr>
+                        <td style="border: 1px solid #ddd; padding: 8px;">${query}</td>
+                        <td style="border: 1px solid #ddd; padding: 8px;">${decision}</td>
+                        <td style="border: 1px solid #ddd; padding: 8px;">${amount}</td>
+                        <td style="border: 1px solid #ddd; padding: 8px;">${confidence}</td>
+                        <td style="border: 1px solid #ddd; padding: 8px; color: ${status_color};">${status}</td>
+                    </tr>
+            """)
+
+_BATCH_TABLE_FOOT = string.Template("""
+                </tbody>
+            </table>
+            <p style="margin-top: 10px; color: #666;">
+                ✅ Processed ${total} queries successfully | ❌ ${errors} queries failed
+            </p>
+        </div>
+        """)
+
+# -----------------------------
+# JSON Serialization
+# -----------------------------
+def _dumps(obj, pretty=False):
+    """Serialize to a JSON string with orjson; indent only for user-facing output"""
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+    return orjson.dumps(obj, option=option, default=str).decode()
+
+def _skip_if_unchanged(payload, last_digest):
+    """Return gr.update() in place of a JSON payload the client already has, plus its digest"""
+    digest = hashlib.blake2b(payload.encode(), digest_size=16).digest()
+    return (gr.update() if digest == last_digest else payload), digest
+
+# -----------------------------
+# Persistence Directories
+# -----------------------------
+_CONFIG_DIR = "config"
+_TEMPLATES_DIR = "templates"
+
+# Created lazily by _atomic_write_json on the first save into each one
+
+# Config name -> (file path, timestamp field stamped on every save)
+_CONFIG_FILES = {
+    "model": (os.path.join(_CONFIG_DIR, "model_config.json"), "saved_at"),
+    "rate_limit": (os.path.join(_CONFIG_DIR, "rate_limit.json"), "updated_at"),
+    "webhook": (os.path.join(_CONFIG_DIR, "webhook.json"), "configured_at"),
+}
+
+# -----------------------------
+# Query History Cache
+# -----------------------------
+# session_id -> (memory version, history list, entries already converted, table rows)
+_history_cache = {}
+
+# Bumped whenever the session changes (reset or new upload) to invalidate cached session views
+_session_version = 0
+
+# -----------------------------
+# Metrics Snapshot Cache
+# -----------------------------
+# Refresh clicks less than this far apart reuse the last serialized snapshot
+_METRICS_TTL_SECONDS = 1.0
+
+def _ttl_cache(seconds):
+    """Memoize a zero-argument producer's serialized output for a short window"""
+    def decorator(fn):
+        entry = [0.0, None]  # [expires_at, value]
+
+        @functools.wraps(fn)
+        def wrapper():
+            now = time.monotonic()
+            if now >= entry[0]:
+                entry[1] = fn()
+                entry[0] = now + seconds
+            return entry[1]
+
+        wrapper.cache_clear = lambda: entry.__setitem__(0, 0.0)
+        return wrapper
+    return decorator
+
 # -----------------------------
 # Enhanced Gradio Interface Functions
 # -----------------------------
@@ -40,12 +211,18 @@ def upload_and_index(files, use_ocr, progress=gr.Progress()):
         progress(0.7, desc="Creating embeddings and indexing...")
         
         # Add to vector store
-        indexed_count = app_state.vector_store.add_documents(chunks, app_state.session_id)
+        session_id = app_state.session_id
+        indexed_count = app_state.vector_store.add_documents(chunks, session_id)
+        
+        # New chunks change what retrieval returns for this session
+        if app_state.qa_chain:
+            app_state.qa_chain.invalidate(session_id)
         
         progress(1.0, desc="Indexing complete!")
         
         # Update application state
         app_state.documents_indexed = True
+        _bump_session_version()
         
         return (
             f"✅ Successfully indexed {indexed_count} chunks from {len(files)} file(s).",
@@ -86,11 +263,15 @@ def ask_question(question, chat_history):
         if not question or not question.strip():
             return chat_history, "Please enter a valid question.", "", "", "", "", ""
         
+        session_id = app_state.session_id
+        
         # Make API call to trigger webhooks
         api_data = {
             "query": question,
-            "session_id": app_state.session_id,
-            "user_id": f"user_{app_state.session_id[:8]}"
+            "session_id": session_id,
+            "user_id": f"user_{session_id[:8]}",
+            "evidence_top_k": 5,
+            "format": "markdown"
         }
         
         # Try API call first (for webhooks)
@@ -99,8 +280,8 @@ def ask_question(question, chat_history):
         # Fallback to direct qa_chain if API fails
         if api_result is None:
             logger.warning("API call failed, falling back to direct qa_chain")
-            retriever = app_state.vector_store.get_retriever(app_state.session_id)
-            result = app_state.qa_chain.run(question, retriever, app_state.session_id)
+            retriever = app_state.vector_store.get_retriever(session_id)
+            result = app_state.qa_chain.run(question, retriever, session_id)
         else:
             result = api_result
         
@@ -114,25 +295,24 @@ def ask_question(question, chat_history):
         
         # Format evidence clauses with enhanced information
         evidence_text = ""
-        if result.get('structured_response') and result['structured_response'].get('evidence'):
+        if result.get('evidence_text') is not None:
+            # Backend already truncated and rendered the evidence preview
+            evidence_text = result['evidence_text']
+        elif result.get('structured_response') and result['structured_response'].get('evidence'):
             evidence_clauses = result['structured_response']['evidence']['clauses']
-            evidence_text = "\n\n---\n\n".join(
-                f"{i+1}. [{c.get('clause_id', 'Unknown')}] {c.get('summary', c.get('clause_text', '').strip())} "
-                f"(Relevance: {c.get('decision_relevance', 'Unknown')}, Strength: {c.get('evidence_strength', 'Unknown')})"
-                for i, c in enumerate(evidence_clauses[:5])  # Show top 5 clauses
-            )
+            evidence_text = EvidenceMapper.format_evidence_text(evidence_clauses, top_k=5)  # Show top 5 clauses
         else:
             # Fallback to legacy format
             evidence_text = "\n\n---\n\n".join(
                 f"{i+1}. {ec['text'].strip()}" for i, ec in enumerate(result.get('evidence_clauses', []))
             )
         
-        # Get enhanced JSON output for debug tab
-        json_output = result.get('json_output', 'No structured data available')
+        # Get enhanced JSON output for debug tab (structured dict, serialized once below)
+        json_output = result.get('json_output')
         
         # Add query analysis and reasoning information to debug output
         if result.get('query_analysis') or result.get('reasoning_result'):
-            debug_info = {
+            json_output = {
                 "query_analysis": result.get('query_analysis', {}),
                 "reasoning_result": result.get('reasoning_result', {}),
                 "structured_response": result.get('structured_response', {}),
@@ -141,7 +321,11 @@ def ask_question(question, chat_history):
                 "audit_id": result.get('audit_id', 'N/A'),
                 "processing_time": result.get('processing_time', 'N/A')
             }
-            json_output = json.dumps(debug_info, indent=2)
+        
+        if json_output is None:
+            json_output = 'No structured data available'
+        elif not isinstance(json_output, str):  # Older backends send a pre-encoded string
+            json_output = _dumps(json_output, pretty=True)
         
         return (
             updated_history,
@@ -168,9 +352,12 @@ def reset_session():
     
     if app_state.qa_chain:
         app_state.qa_chain.memory.clear_session(old_session)
+    _history_cache.pop(old_session, None)
+    _bump_session_version()
     
     logger.info(f"Session reset: {old_session} -> {app_state.session_id}")
     
+    user_id, _ = _session_defaults()
     return (
         "✅ Session reset successfully. Please upload new documents.",
         gr.update(interactive=False),
@@ -181,39 +368,83 @@ def reset_session():
         "",  # amount_output
         "",  # justification_output
         "",  # evidence_output
-        ""   # json_output
+        "",  # json_output
+        user_id,  # export_user_id
+        user_id   # delete_user_id
     )
 
 # -----------------------------
 # Real Backend Integration Functions
 # -----------------------------
 
+def _bump_session_version():
+    """Invalidate cached session views after the session changes"""
+    global _session_version
+    _session_version += 1
+    _invalidate_metrics()
+
+def _invalidate_metrics():
+    """Drop cached metrics snapshots so the next refresh recomputes them"""
+    get_cache_statistics.cache_clear()
+    get_performance_metrics.cache_clear()
+
+@functools.lru_cache(maxsize=4)
+def _build_session_info(version, vector_store_ready, qa_chain_ready):
+    """Serialize session info once per session version and component readiness"""
+    session_info = {
+        "session_id": app_state.session_id,
+        "user_id": f"user_{app_state.session_id[:8]}",
+        "documents_indexed": app_state.documents_indexed,
+        "session_start_time": datetime.now().isoformat(),
+        "status": "Active",
+        "vector_store_status": "Connected" if vector_store_ready else "Not Connected",
+        "qa_chain_status": "Ready" if qa_chain_ready else "Not Ready"
+    }
+    return _dumps(session_info, pretty=True)
+
 def get_session_info():
     """Get current session information"""
     try:
-        session_info = {
-            "session_id": app_state.session_id,
-            "user_id": f"user_{app_state.session_id[:8]}",
-            "documents_indexed": app_state.documents_indexed,
-            "session_start_time": datetime.now().isoformat(),
-            "status": "Active",
-            "vector_store_status": "Connected" if app_state.vector_store else "Not Connected",
-            "qa_chain_status": "Ready" if app_state.qa_chain else "Not Ready"
-        }
-        return json.dumps(session_info, indent=2)
+        return _build_session_info(_session_version, bool(app_state.vector_store), bool(app_state.qa_chain))
     except Exception as e:
-        return json.dumps({"error": str(e)}, indent=2)
+        return _dumps({"error": str(e)}, pretty=True)
+
+@functools.lru_cache(maxsize=4)
+def _build_session_defaults(version):
+    """Build the session-derived user ID and security status once per session version"""
+    session_id = app_state.session_id
+    user_id = f"user_{session_id[:8]}"
+    security_status = {
+        "encryption_enabled": True,
+        "access_control_enabled": True,
+        "audit_logging_enabled": True,
+        "gdpr_compliance_enabled": True,
+        "session_id": session_id,
+        "user_id": user_id
+    }
+    return user_id, security_status
+
+def _session_defaults():
+    """Get the session-derived user ID and security status for the current session"""
+    return _build_session_defaults(_session_version)
+
+def refresh_session_info(last_digest=None):
+    """Refresh session info along with the session-derived security status"""
+    # The GDPR user ID fields are left alone here: they may hold an ID the user typed in
+    _, security_status = _session_defaults()
+    session_info, digest = _skip_if_unchanged(get_session_info(), last_digest)
+    return session_info, security_status, digest
 
+@_ttl_cache(_METRICS_TTL_SECONDS)
 def get_cache_statistics():
     """Get real cache statistics"""
+    now_iso = datetime.now().isoformat()
     try:
-        if hasattr(app_state, 'cache_manager') and app_state.cache_manager:
-            stats = app_state.cache_manager.get_cache_statistics()
-        else:
+        cache_manager = app_state.cache_manager
+        if not cache_manager:
             # Initialize cache manager if not available
-            from src.utils.cache_manager import CacheManager
-            app_state.cache_manager = CacheManager()
-            stats = app_state.cache_manager.get_cache_statistics()
+            cache_manager = app_state.cache_manager = CacheManager()
+        stats = cache_manager.get_cache_statistics()
         
         # Ensure stats is a dict and has required fields
         if not isinstance(stats, dict):
@@ -224,7 +455,7 @@ def get_cache_statistics():
             "hit_rate": "0%",
             "total_cache_entries": 0,
             "cache_size_mb": 0,
-            "last_cleanup": datetime.now().isoformat(),
+            "last_cleanup": now_iso,
             "status": "active"
         }
         
@@ -232,24 +463,28 @@ def get_cache_statistics():
             if key not in stats:
                 stats[key] = default_value
         
-        return json.dumps(stats, indent=2)
+        return _dumps(stats, pretty=True)
     except Exception as e:
         error_response = {
             "error": str(e),
             "hit_rate": "0%",
             "total_cache_entries": 0,
             "cache_size_mb": 0,
-            "last_cleanup": datetime.now().isoformat(),
+            "last_cleanup": now_iso,
             "status": "error"
         }
-        return json.dumps(error_response, indent=2)
+        return _dumps(error_response, pretty=True)
+
+def refresh_cache_statistics(last_digest=None):
+    """Refresh cache statistics, skipping the update when nothing changed"""
+    return _skip_if_unchanged(get_cache_statistics(), last_digest)
 
 def get_audit_trail(start_date, end_date, decision_type):
     """Get real audit trail with filters"""
     try:
-        if not hasattr(app_state, 'qa_chain') or not hasattr(app_state.qa_chain, 'audit_trail'):
-            # Return empty DataFrame with proper structure
-            return pd.DataFrame(columns=["Timestamp", "Action", "Decision", "Amount", "Query"])
+        audit_trail = app_state.audit_trail
+        if audit_trail is None:
+            return []
         
         # Convert dates if provided
         start_dt = None
@@ -276,7 +511,7 @@ def get_audit_trail(start_date, end_date, decision_type):
         # Get audit trail with error handling
         trail = []
         try:
-            trail = app_state.qa_chain.audit_trail.get_audit_trail(
+            trail = audit_trail.get_audit_trail(
                 session_id=app_state.session_id,
                 start_date=start_dt,
                 end_date=end_dt,
@@ -289,26 +524,25 @@ def get_audit_trail(start_date, end_date, decision_type):
             logger.error(f"Error getting audit trail: {e}")
             trail = []
         
-        # Convert to DataFrame for display
+        # Convert to rows for display (gr.Dataframe takes a list of lists)
+        rows = []
         if trail and isinstance(trail, list):
-            df_data = []
             for entry in trail:
                 if isinstance(entry, dict):
                     decision_data = entry.get("decision", {})
-                    df_data.append({
-                        "Timestamp": entry.get("timestamp", ""),
-                        "Action": entry.get("action", ""),
-                        "Decision": decision_data.get("status", "") if isinstance(decision_data, dict) else str(decision_data),
-                        "Amount": decision_data.get("amount", "") if isinstance(decision_data, dict) else "",
-                        "Query": entry.get("query", "")[:50] + "..." if len(entry.get("query", "")) > 50 else entry.get("query", "")
-                    })
-            return pd.DataFrame(df_data)
-        else:
-            return pd.DataFrame(columns=["Timestamp", "Action", "Decision", "Amount", "Query"])
+                    query = entry.get("query", "")
+                    rows.append([
+                        entry.get("timestamp", ""),
+                        entry.get("action", ""),
+                        decision_data.get("status", "") if isinstance(decision_data, dict) else str(decision_data),
+                        decision_data.get("amount", "") if isinstance(decision_data, dict) else "",
+                        query[:50] + "..." if len(query) > 50 else query
+                    ])
+        return rows
             
     except Exception as e:
         logger.error(f"Failed to get audit trail: {e}")
-        return pd.DataFrame(columns=["Timestamp", "Action", "Decision", "Amount", "Query"])
+        return []
 
 def process_batch_queries(batch_text, progress=gr.Progress()):
     """Process multiple queries at once with real backend and progress"""
@@ -321,7 +555,9 @@ def process_batch_queries(batch_text, progress=gr.Progress()):
             return "❌ No valid queries provided."
         
         results = []
-        retriever = app_state.vector_store.get_retriever(app_state.session_id)
+        session_id = app_state.session_id
+        qa_chain = app_state.qa_chain
+        retriever = app_state.vector_store.get_retriever(session_id)
         
         # More visible progress updates
         progress(0.0, desc=f"🚀 Starting batch processing of {len(queries)} queries...")
@@ -332,7 +568,7 @@ def process_batch_queries(batch_text, progress=gr.Progress()):
                 progress_percent = (i + 1) / len(queries)
                 progress(progress_percent, desc=f"📝 Processing query {i + 1}/{len(queries)}: {query[:50]}...")
                 
-                result = app_state.qa_chain.run(query, retriever, app_state.session_id)
+                result = qa_chain.run(query, retriever, session_id)
                 results.append({
                     "Query": query,
                     "Decision": result.get('decision', 'Unknown'),
@@ -342,7 +578,6 @@ def process_batch_queries(batch_text, progress=gr.Progress()):
                 })
                 
                 # Small delay to make progress visible
-                import time
                 time.sleep(0.1)
                 
             except Exception as e:
@@ -357,49 +592,25 @@ def process_batch_queries(batch_text, progress=gr.Progress()):
         
         progress(1.0, desc="✅ Batch processing complete!")
         
-        # Convert to DataFrame for display with better formatting
-        df = pd.DataFrame(results)
-        
         # Create a more detailed HTML table
-        html_table = """
-        <div style="margin: 20px 0;">
-            <h3>📊 Batch Processing Results</h3>
-            <table style="width: 100%; border-collapse: collapse; margin-top: 10px;">
-                <thead>
-                    <tr style="background-color: #f0f0f0;">
-                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Query</th>
-                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Decision</th>
-                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Amount</th>
-                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Confidence</th>
-                        <th style="border: 1px solid #ddd; padding: 8px; text-align: left;">Status</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
+        parts = [_BATCH_TABLE_HEAD]
         
-        for _, row in df.iterrows():
+        for row in results:
             status_color = "green" if "Success" in row['Status'] else "red"
-            html_table += f"""
-                    <tr>
-                        <td style="border: 1px solid #ddd; padding: 8px;">{row['Query']}</td>
-                        <td style="border: 1px solid #ddd; padding: 8px;">{row['Decision']}</td>
-                        <td style="border: 1px solid #ddd; padding: 8px;">{row['Amount']}</td>
-                        <td style="border: 1px solid #ddd; padding: 8px;">{row['Confidence']}</td>
-                        <td style="border: 1px solid #ddd; padding: 8px; color: {status_color};">{row['Status']}</td>
-                    </tr>
-            """
-        
-        html_table += """
-                </tbody>
-            </table>
-            <p style="margin-top: 10px; color: #666;">
-                ✅ Processed {total} queries successfully | ❌ {errors} queries failed
-            </p>
-        </div>
-        """.format(
-            total=len([r for r in results if "Success" in r['Status']]),
-            errors=len([r for r in results if "Error" in r['Status']])
-        )
+            parts.append(_BATCH_ROW_TEMPLATE.substitute(
+                query=html.escape(str(row['Query'])),
+                decision=html.escape(str(row['Decision'])),
+                amount=html.escape(str(row['Amount'])),
+                confidence=html.escape(str(row['Confidence'])),
+                status_color=status_color,
+                status=html.escape(str(row['Status']))
+            ))
+        
+        parts.append(_BATCH_TABLE_FOOT.substitute(
+            total=sum(1 for r in results if "Success" in r['Status']),
+            errors=sum(1 for r in results if "Error" in r['Status'])
+        ))
+        html_table = "".join(parts)
         
         return html_table
         
@@ -410,8 +621,10 @@ def process_batch_queries(batch_text, progress=gr.Progress()):
 def clear_cache():
     """Clear all caches"""
     try:
-        if hasattr(app_state, 'cache_manager') and app_state.cache_manager:
-            cleared = app_state.cache_manager.clear_all_caches()
+        cache_manager = app_state.cache_manager
+        if cache_manager:
+            cleared = cache_manager.clear_all_caches()
+            _invalidate_metrics()
             return f"✅ Cleared {cleared} cache entries successfully."
         else:
             return "❌ Cache manager not available."
@@ -425,7 +638,6 @@ def update_api_keys(pinecone_key, groq_key, huggingface_key):
             return "❌ Please provide all API keys."
         
         # Update environment variables
-        import os
         os.environ['PINECONE_API_KEY'] = pinecone_key
         os.environ['GROQ_API_KEY'] = groq_key
         os.environ['HUGGINGFACE_API_KEY'] = huggingface_key
@@ -434,18 +646,70 @@ def update_api_keys(pinecone_key, groq_key, huggingface_key):
     except Exception as e:
         return f"❌ Failed to update API keys: {str(e)}"
 
-def save_query_template(template_name, query_text):
+def _atomic_write_json(path, data, pretty=False):
+    """Atomically write JSON data to disk via a temp file and os.replace"""
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    directory = os.path.dirname(path) or "."
+    tmp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex}.tmp")
+    # O_EXCL with 0o666 gives the temp file the mode a plain open() would, umask applied
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    try:
+        fd = os.open(tmp_path, flags, 0o666)
+    except FileNotFoundError:
+        # Directory is created lazily on the first write only
+        os.makedirs(directory, exist_ok=True)
+        fd = os.open(tmp_path, flags, 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # Keep the replaced file's permissions so other readers (deploy users, backups) keep access
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        # Never leave a half-written temp file behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    # Persist the rename itself; directories cannot be opened this way on Windows
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+async def _persist(name, payload, success_message, failure_message):
+    """Timestamp a config payload, write it and build the status message"""
+    try:
+        path, timestamp_field = _CONFIG_FILES[name]
+        payload[timestamp_field] = datetime.now().isoformat()
+        
+        # Keep disk I/O off the event loop
+        await asyncio.to_thread(_atomic_write_json, path, payload)
+        
+        return success_message
+    except Exception as e:
+        logger.error(f"Failed to save {name} config: {e}")
+        return f"❌ {failure_message}: {str(e)}"
+
+def _read_json_file(path):
+    """Read JSON data from disk"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+async def save_query_template(template_name, query_text):
     """Save a query template with persistent storage"""
     try:
         if not template_name or not query_text:
             return "❌ Please provide both template name and query text."
         
         # Save to file for persistence
-        import os
-        templates_dir = "templates"
-        os.makedirs(templates_dir, exist_ok=True)
-        
-        template_file = os.path.join(templates_dir, f"{template_name}.json")
+        template_file = os.path.join(_TEMPLATES_DIR, f"{template_name}.json")
         template_data = {
             "name": template_name,
             "query": query_text,
@@ -453,41 +717,41 @@ def save_query_template(template_name, query_text):
             "usage_count": 0
         }
         
-        with open(template_file, 'w') as f:
-            json.dump(template_data, f, indent=2)
+        # Keep disk I/O off the event loop
+        await asyncio.to_thread(_atomic_write_json, template_file, template_data, True)
         
         return f"✅ Template '{template_name}' saved successfully."
     except Exception as e:
         return f"❌ Failed to save template: {str(e)}"
 
-def load_query_template(template_name):
+async def load_query_template(template_name):
     """Load a query template"""
     try:
         if not template_name:
             return "❌ Please provide a template name."
         
-        import os
-        templates_dir = "templates"
-        template_file = os.path.join(templates_dir, f"{template_name}.json")
+        template_file = os.path.join(_TEMPLATES_DIR, f"{template_name}.json")
         
-        if not os.path.exists(template_file):
+        try:
+            template_data = await asyncio.to_thread(_read_json_file, template_file)
+        except FileNotFoundError:
             return f"❌ Template '{template_name}' not found."
         
-        with open(template_file, 'r') as f:
-            template_data = json.load(f)
-        
         return template_data.get("query", "")
     except Exception as e:
         return f"❌ Failed to load template: {str(e)}"
 
+@_ttl_cache(_METRICS_TTL_SECONDS)
 def get_performance_metrics():
     """Get real system performance metrics"""
+    now_iso = datetime.now().isoformat()
     try:
         # Get real metrics from backend components with error handling
         cache_stats = {}
-        if hasattr(app_state, 'cache_manager') and app_state.cache_manager:
+        cache_manager = app_state.cache_manager
+        if cache_manager:
             try:
-                cache_stats = app_state.cache_manager.get_cache_statistics()
+                cache_stats = cache_manager.get_cache_statistics()
                 if not isinstance(cache_stats, dict):
                     cache_stats = {}
             except Exception as e:
@@ -495,17 +759,18 @@ def get_performance_metrics():
                 cache_stats = {}
         
         audit_stats = {}
-        if hasattr(app_state, 'qa_chain') and hasattr(app_state.qa_chain, 'audit_trail'):
+        audit_trail = app_state.audit_trail
+        if audit_trail is not None:
             try:
                 # Use try-catch to prevent recursion errors
                 decision_count = 0
                 activity_count = 0
                 try:
-                    decision_count = len(app_state.qa_chain.audit_trail.decision_history)
+                    decision_count = len(audit_trail.decision_history)
                 except:
                     pass
                 try:
-                    activity_count = len(app_state.qa_chain.audit_trail.activity_log)
+                    activity_count = len(audit_trail.activity_log)
                 except:
                     pass
                 
@@ -517,27 +782,28 @@ def get_performance_metrics():
                 logger.error(f"Error getting audit stats: {e}")
                 audit_stats = {"total_decisions": 0, "total_activities": 0}
         
+        session_id = app_state.session_id
         metrics = {
-            "session_id": getattr(app_state, 'session_id', 'unknown'),
-            "user_id": f"user_{getattr(app_state, 'session_id', 'unknown')[:8]}",
-            "documents_indexed": getattr(app_state, 'documents_indexed', False),
-            "session_start_time": datetime.now().isoformat(),
+            "session_id": session_id,
+            "user_id": f"user_{session_id[:8]}",
+            "documents_indexed": app_state.documents_indexed,
+            "session_start_time": now_iso,
             "cache_hit_rate": cache_stats.get("hit_rate", "0%"),
             "total_cache_entries": cache_stats.get("total_cache_entries", 0),
             "total_decisions": audit_stats.get("total_decisions", 0),
             "total_activities": audit_stats.get("total_activities", 0),
             "system_status": "Healthy",
-            "vector_store_status": "Connected" if hasattr(app_state, 'vector_store') and app_state.vector_store else "Not Connected",
-            "qa_chain_status": "Ready" if hasattr(app_state, 'qa_chain') and app_state.qa_chain else "Not Ready"
+            "vector_store_status": "Connected" if app_state.vector_store else "Not Connected",
+            "qa_chain_status": "Ready" if app_state.qa_chain else "Not Ready"
         }
-        return json.dumps(metrics, indent=2)
+        return _dumps(metrics, pretty=True)
     except Exception as e:
         error_metrics = {
             "error": str(e),
             "session_id": "unknown",
             "user_id": "unknown",
             "documents_indexed": False,
-            "session_start_time": datetime.now().isoformat(),
+            "session_start_time": now_iso,
             "cache_hit_rate": "0%",
             "total_cache_entries": 0,
             "total_decisions": 0,
@@ -546,39 +812,46 @@ def get_performance_metrics():
             "vector_store_status": "Unknown",
             "qa_chain_status": "Unknown"
         }
-        return json.dumps(error_metrics, indent=2)
+        return _dumps(error_metrics, pretty=True)
+
+def refresh_performance_metrics(last_digest=None):
+    """Refresh performance metrics, skipping the update when nothing changed"""
+    return _skip_if_unchanged(get_performance_metrics(), last_digest)
 
 def export_user_data(user_id):
     """Export real user data for GDPR compliance"""
+    now_iso = datetime.now().isoformat()
     try:
         if not user_id or not user_id.strip():
             error_response = {
                 "error": "Please provide a user ID.",
                 "user_id": "",
-                "export_timestamp": datetime.now().isoformat(),
+                "export_timestamp": now_iso,
                 "session_data": [],
                 "query_history": [],
                 "decisions": []
             }
-            return json.dumps(error_response, indent=2)
+            return _dumps(error_response, pretty=True)
         
         # Get real data from audit trail
         export_data = {
             "user_id": user_id,
-            "export_timestamp": datetime.now().isoformat(),
+            "export_timestamp": now_iso,
             "session_data": [],
             "query_history": [],
             "decisions": []
         }
         
-        if hasattr(app_state, 'qa_chain') and hasattr(app_state.qa_chain, 'audit_trail'):
+        session_id = app_state.session_id
+        audit_trail = app_state.audit_trail
+        if audit_trail is not None:
             try:
-                audit_trail = app_state.qa_chain.audit_trail
                 
                 # Get session data safely
                 try:
-                    if app_state.session_id in audit_trail.session_trails:
-                        export_data["session_data"] = audit_trail.session_trails[app_state.session_id]
+                    session_trails = audit_trail.session_trails
+                    if session_id in session_trails:
+                        export_data["session_data"] = session_trails[session_id]
                 except Exception as e:
                     logger.error(f"Error getting session data: {e}")
                     export_data["session_data"] = []
@@ -586,7 +859,7 @@ def export_user_data(user_id):
                 # Get decision history safely
                 try:
                     export_data["decisions"] = audit_trail.get_decision_history(
-                        session_id=app_state.session_id,
+                        session_id=session_id,
                         user_id=user_id
                     )
                 except Exception as e:
@@ -595,8 +868,9 @@ def export_user_data(user_id):
                 
                 # Get query history from memory safely
                 try:
-                    if hasattr(app_state.qa_chain, 'memory'):
-                        query_history = app_state.qa_chain.memory.get_history(app_state.session_id)
+                    memory = app_state.memory
+                    if memory is not None:
+                        query_history = memory.get_history(session_id)
                         export_data["query_history"] = query_history
                 except Exception as e:
                     logger.error(f"Error getting query history: {e}")
@@ -606,17 +880,17 @@ def export_user_data(user_id):
                 logger.error(f"Error accessing audit trail: {e}")
                 export_data["error"] = f"Failed to access audit trail: {str(e)}"
         
-        return json.dumps(export_data, indent=2)
+        return _dumps(export_data, pretty=True)
     except Exception as e:
         error_response = {
             "error": f"Failed to export data: {str(e)}",
             "user_id": user_id if user_id else "",
-            "export_timestamp": datetime.now().isoformat(),
+            "export_timestamp": now_iso,
             "session_data": [],
             "query_history": [],
             "decisions": []
         }
-        return json.dumps(error_response, indent=2)
+        return _dumps(error_response, pretty=True)
 
 def delete_user_data(user_id):
     """Delete real user data for GDPR compliance"""
@@ -624,57 +898,37 @@ def delete_user_data(user_id):
         if not user_id:
             return "❌ Please provide a user ID."
         
+        session_id = app_state.session_id
+        
         # Delete from audit trail
-        if hasattr(app_state, 'qa_chain') and hasattr(app_state.qa_chain, 'audit_trail'):
-            audit_trail = app_state.qa_chain.audit_trail
+        audit_trail = app_state.audit_trail
+        if audit_trail is not None:
             
             # Remove session data
-            if app_state.session_id in audit_trail.session_trails:
-                del audit_trail.session_trails[app_state.session_id]
-            
-            # Remove from decision history
-            audit_trail.decision_history = [
-                d for d in audit_trail.decision_history 
-                if d.get('user_id') != user_id
-            ]
+            audit_trail.session_trails.pop(session_id, None)
             
-            # Remove from activity log
-            audit_trail.activity_log = [
-                a for a in audit_trail.activity_log 
-                if a.get('user_id') != user_id
-            ]
+            # Remove from decision history and activity log
+            audit_trail.delete_user_data(user_id)
         
         # Clear memory
-        if hasattr(app_state.qa_chain, 'memory'):
-            app_state.qa_chain.memory.clear_session(app_state.session_id)
+        memory = app_state.memory
+        if memory is not None:
+            memory.clear_session(session_id)
+        _history_cache.pop(session_id, None)
         
         return f"✅ User data for {user_id} has been deleted successfully."
     except Exception as e:
         return f"❌ Failed to delete data: {str(e)}"
 
-def configure_webhook(webhook_url, events):
+async def configure_webhook(webhook_url, events):
     """Configure webhook"""
-    try:
-        if not webhook_url:
-            return "❌ Please provide a webhook URL."
-        
-        # Store webhook configuration
-        webhook_config = {
-            "url": webhook_url,
-            "events": events,
-            "configured_at": datetime.now().isoformat(),
-            "status": "active"
-        }
-        
-        # Save to file
-        import os
-        os.makedirs("config", exist_ok=True)
-        with open("config/webhook.json", 'w') as f:
-            json.dump(webhook_config, f, indent=2)
-        
-        return f"✅ Webhook configured successfully for URL: {webhook_url}"
-    except Exception as e:
-        return f"❌ Failed to configure webhook: {str(e)}"
+    if not webhook_url:
+        return "❌ Please provide a webhook URL."
+    
+    webhook_config = {"url": webhook_url, "events": events, "status": "active"}
+    return await _persist("webhook", webhook_config,
+                    f"✅ Webhook configured successfully for URL: {webhook_url}",
+                    "Failed to configure webhook")
 
 def get_query_validation(query):
     """Get real query validation results"""
@@ -689,12 +943,13 @@ def get_query_validation(query):
                 "warnings": [],
                 "errors": ["No query provided"]
             }
-            return json.dumps(validation, indent=2)
+            return _dumps(validation, pretty=True)
         
         # Use the actual query processor
-        if hasattr(app_state, 'qa_chain') and hasattr(app_state.qa_chain, 'query_processor'):
+        query_processor = app_state.query_processor
+        if query_processor is not None:
             try:
-                validation_result = app_state.qa_chain.query_processor.process_query(query)
+                validation_result = query_processor.process_query(query)
                 
                 # Ensure validation_result is a dict
                 if not isinstance(validation_result, dict):
@@ -711,7 +966,7 @@ def get_query_validation(query):
                     "errors": validation_result.get('validation', {}).get('errors', [])
                 }
                 
-                return json.dumps(validation, indent=2)
+                return _dumps(validation, pretty=True)
             except Exception as e:
                 error_validation = {
                     "query": query,
@@ -722,7 +977,7 @@ def get_query_validation(query):
                     "warnings": [],
                     "errors": [f"Query processor error: {str(e)}"]
                 }
-                return json.dumps(error_validation, indent=2)
+                return _dumps(error_validation, pretty=True)
         else:
             error_validation = {
                 "query": query,
@@ -733,7 +988,7 @@ def get_query_validation(query):
                 "warnings": [],
                 "errors": ["Query processor not available"]
             }
-            return json.dumps(error_validation, indent=2)
+            return _dumps(error_validation, pretty=True)
     except Exception as e:
         error_validation = {
             "query": query if query else "",
@@ -744,74 +999,76 @@ def get_query_validation(query):
             "warnings": [],
             "errors": [f"Validation failed: {str(e)}"]
         }
-        return json.dumps(error_validation, indent=2)
+        return _dumps(error_validation, pretty=True)
 
 def get_query_history():
     """Get real query history"""
     try:
-        if hasattr(app_state, 'qa_chain') and hasattr(app_state.qa_chain, 'memory'):
-            history = app_state.qa_chain.memory.get_history(app_state.session_id)
+        memory = app_state.memory
+        if memory is not None:
+            session_id = app_state.session_id
+            version = memory.get_version(session_id)
+            
+            # Unchanged version means unchanged history, so skip reading memory at all
+            cached = _history_cache.get(session_id)
+            if cached is not None and cached[0] == version:
+                return cached[3]
             
-            # Convert to DataFrame format
-            df_data = []
-            for entry in history:
-                if entry.get('role') == 'human':
-                    df_data.append({
-                        "Timestamp": entry.get('timestamp', datetime.now().isoformat()),
-                        "Query": entry.get('content', ''),
-                        "Decision": "N/A",  # Would need to cross-reference with audit trail
-                        "Status": "Processed"
-                    })
+            history = memory.get_history(session_id)
             
-            return pd.DataFrame(df_data)
+            # Reuse the cached rows and only convert entries appended to the same list
+            if cached is not None and cached[1] is history:
+                last_len, cached_rows = cached[2], cached[3]
+            else:
+                # History was cleared or replaced; rebuild from scratch
+                last_len, cached_rows = 0, None
+            
+            # Decision would need to be cross-referenced with the audit trail
+            now_iso = datetime.now().isoformat()
+            new_rows = [
+                [entry.get('timestamp', now_iso), entry.get('content', ''), "N/A", "Processed"]
+                for entry in history[last_len:] if entry.get('role') == 'human'
+            ]
+            
+            # Build a new list so rows already handed to Gradio are never mutated
+            rows = cached_rows + new_rows if cached_rows else new_rows
+            
+            _history_cache[session_id] = (version, history, len(history), rows)
+            return rows
         else:
-            return pd.DataFrame(columns=["Timestamp", "Query", "Decision", "Status"])
+            return []
     except Exception as e:
         logger.error(f"Failed to get query history: {e}")
-        return pd.DataFrame(columns=["Timestamp", "Query", "Decision", "Status"])
+        return []
 
-def save_model_config(temperature, max_tokens):
+async def save_model_config(temperature, max_tokens):
     """Save model configuration"""
-    try:
-        config = {
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "saved_at": datetime.now().isoformat()
-        }
-        
-        # Save to file
-        import os
-        os.makedirs("config", exist_ok=True)
-        with open("config/model_config.json", 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        return f"✅ Model configuration saved: Temperature={temperature}, Max Tokens={max_tokens}"
-    except Exception as e:
-        return f"❌ Failed to save configuration: {str(e)}"
+    return await _persist("model", {"temperature": temperature, "max_tokens": max_tokens},
+                    f"✅ Model configuration saved: Temperature={temperature}, Max Tokens={max_tokens}",
+                    "Failed to save configuration")
 
-def update_rate_limit(rate_limit):
+async def update_rate_limit(rate_limit):
     """Update rate limit"""
-    try:
-        # Save rate limit configuration
-        config = {
-            "rate_limit": rate_limit,
-            "updated_at": datetime.now().isoformat()
-        }
-        
-        import os
-        os.makedirs("config", exist_ok=True)
-        with open("config/rate_limit.json", 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        return f"✅ Rate limit updated to {rate_limit} requests per minute"
-    except Exception as e:
-        return f"❌ Failed to update rate limit: {str(e)}"
+    return await _persist("rate_limit", {"rate_limit": rate_limit},
+                    f"✅ Rate limit updated to {rate_limit} requests per minute",
+                    "Failed to update rate limit")
 
 # -----------------------------
 # Build Enhanced Gradio Interface
 # -----------------------------
 
+_INTERFACE_SINGLETON = None
+_INTERFACE_LOCK = threading.Lock()
+
 def build_interface():
+    """Return the Gradio interface, building it only on first use (set REBUILD_UI=1 to force a rebuild)"""
+    global _INTERFACE_SINGLETON
+    with _INTERFACE_LOCK:
+        if _INTERFACE_SINGLETON is None or os.environ.get("REBUILD_UI") == "1":
+            _INTERFACE_SINGLETON = _build_interface()
+        return _INTERFACE_SINGLETON
+
+def _build_interface():
     """Enhanced Gradio interface with all advanced features"""
 
     theme = gr.themes.Soft(
@@ -820,17 +1077,12 @@ def build_interface():
         text_size="lg"
     )
 
+    default_user_id, default_security_status = _session_defaults()
+
     with gr.Blocks(theme=theme, title="Advanced Document Q&A Assistant") as interface:
 
         # Main Title with enhanced styling
-        gr.Markdown(
-            """
-            # 🚀 Advanced Document Q&A Assistant
-            ### Intelligent Document Analysis with Advanced Analytics & Monitoring
-            
-            *Powered by RAG, Multi-Hop Reasoning, and Real-time Analytics*
-            """
-        )
+        gr.Markdown(_HEADER_MD)
 
         with gr.Tabs():
             
@@ -843,7 +1095,7 @@ def build_interface():
                         
                         file_input = gr.File(
                             file_count="multiple",
-                            file_types=[".pdf", ".txt", ".docx", ".doc", ".eml", ".msg", ".png", ".jpg", ".jpeg"],
+                            file_types=_SUPPORTED_FILE_TYPES,
                             label="Upload Documents"
                         )
                         
@@ -862,6 +1114,7 @@ def build_interface():
                         gr.Markdown("### 📊 Session Information")
                         session_info_btn = gr.Button("🔄 Refresh Session Info", variant="primary")
                         session_info = gr.JSON(label="Current Session", value={"session_id": "Loading..."})
+                        session_info_digest = gr.State(None)
                         
                     # Right Column - Chat Interface
                     with gr.Column(scale=2):
@@ -914,10 +1167,12 @@ def build_interface():
                         gr.Markdown("### 📈 Performance Metrics")
                         performance_btn = gr.Button("🔄 Refresh Metrics", variant="primary")
                         performance_output = gr.JSON(label="System Performance", value={"status": "Click Refresh to load metrics"})
+                        performance_digest = gr.State(None)
                         
                         gr.Markdown("### 💾 Cache Statistics")
                         cache_btn = gr.Button("🔄 Refresh Cache Stats", variant="primary")
                         cache_output = gr.JSON(label="Cache Performance", value={"status": "Click Refresh to load cache stats"})
+                        cache_digest = gr.State(None)
                         
                         clear_cache_btn = gr.Button("🗑️ Clear Cache", variant="secondary")
                     
@@ -982,27 +1237,20 @@ def build_interface():
                     with gr.Column(scale=1):
                         gr.Markdown("### 📤 Data Export")
                         
-                        export_user_id = gr.Textbox(label="User ID for Export", value=f"user_{app_state.session_id[:8]}")
+                        export_user_id = gr.Textbox(label="User ID for Export", value=default_user_id)
                         export_btn = gr.Button("📤 Export User Data", variant="primary")
                         export_output = gr.JSON(label="Exported Data", value={"status": "Click Export to download data"})
                     
                     with gr.Column(scale=1):
                         gr.Markdown("### 🗑️ Data Deletion")
                         
-                        delete_user_id = gr.Textbox(label="User ID for Deletion", value=f"user_{app_state.session_id[:8]}")
+                        delete_user_id = gr.Textbox(label="User ID for Deletion", value=default_user_id)
                         delete_btn = gr.Button("🗑️ Delete User Data", variant="secondary")
                         delete_status = gr.Textbox(label="Deletion Status", interactive=False)
                         
                         gr.Markdown("### 🔐 Security Status")
                         
-                        security_status = gr.JSON(label="Security Status", value={
-                            "encryption_enabled": True,
-                            "access_control_enabled": True,
-                            "audit_logging_enabled": True,
-                            "gdpr_compliance_enabled": True,
-                            "session_id": app_state.session_id,
-                            "user_id": f"user_{app_state.session_id[:8]}"
-                        })
+                        security_status = gr.JSON(label="Security Status", value=default_security_status)
             
             # ===== QUERY TOOLS TAB =====
             with gr.Tab("🔍 Query Tools", id=5):
@@ -1033,192 +1281,60 @@ def build_interface():
                         
                         gr.Markdown("### 💡 Query Optimization")
                         
-                        optimization_tips = gr.Markdown("""
-                        **💡 Query Optimization Tips:**
-                        
-                        1. **Be Specific**: Include age, gender, procedure details
-                        2. **Add Context**: Mention location, policy duration
-                        3. **Use Keywords**: Include medical terms and procedures
-                        4. **Be Clear**: Avoid ambiguous language
-                        5. **Include Details**: Add urgency, severity if applicable
-                        
-                        **Example Good Queries:**
-                        - "46-year-old male, knee surgery in Pune, 3-month policy"
-                        - "Female patient, 35 years old, cataract surgery in Mumbai"
-                        - "Angioplasty procedure for 50-year-old male, urgent case"
-                        """)
+                        optimization_tips = gr.Markdown(_OPTIMIZATION_TIPS_MD)
 
         # Footer with enhanced instructions
         with gr.Accordion("📋 Instructions & Help", open=False):
-            gr.Markdown("""
-            ## 🚀 Advanced Features Guide
-            
-            ### 📁 Document Upload
-            1. **Supported Formats**: PDF, TXT, DOCX, DOC, EML, MSG, Images (PNG, JPG, JPEG)
-            2. **Enable OCR** for image files if needed
-            3. **Click Process & Index** to extract knowledge
-            
-            ### 💬 Query Interface
-            1. **Ask Questions** in natural language
-            2. **View Results** in Answer, Decision Summary, and Debug tabs
-            3. **Use Templates** for common query patterns
-            
-            ### ⚡ Batch Processing
-            1. **Enter Multiple Queries** (one per line)
-            2. **Process All at Once** for efficiency
-            3. **View Results** in organized table format
-            
-            ### 📊 Analytics & Monitoring
-            1. **Monitor Performance** with real-time metrics
-            2. **View Cache Statistics** for optimization
-            3. **Browse Audit Trail** for decision history
-            
-            ### ⚙️ Configuration
-            1. **Update API Keys** as needed
-            2. **Configure Model Parameters** for optimal performance
-            3. **Set Up Webhooks** for external integrations
-            4. **Manage Rate Limits** for system stability
-            
-            ### 🔒 GDPR & Security
-            1. **Export User Data** for compliance
-            2. **Delete User Data** when requested
-            3. **Monitor Security Status** continuously
-            """)
-
-        # Event handlers for main interface
-        index_btn.click(
-            fn=upload_and_index,
-            inputs=[file_input, ocr_toggle],
-            outputs=[status_output, send_btn]
-        ).then(
-            fn=lambda: gr.update(interactive=True),
-            outputs=[question_input]
-        )
-
-        send_btn.click(
-            fn=ask_question,
-            inputs=[question_input, chatbot],
-            outputs=[chatbot, answer_output, decision_output, amount_output, justification_output, evidence_output, json_output]
-        ).then(
-            fn=lambda: gr.update(value=""),
-            outputs=[question_input]
-        )
-
-        question_input.submit(
-            fn=ask_question,
-            inputs=[question_input, chatbot],
-            outputs=[chatbot, answer_output, decision_output, amount_output, justification_output, evidence_output, json_output]
-        ).then(
-            fn=lambda: gr.update(value=""),
-            outputs=[question_input]
-        )
-
-        reset_btn.click(
-            fn=reset_session,
-            outputs=[status_output, send_btn, chatbot, answer_output, question_input,
-                     decision_output, amount_output, justification_output, evidence_output, json_output]
-        )
-
-        # Event handlers for session info
-        session_info_btn.click(
-            fn=get_session_info,
-            outputs=[session_info]
-        )
-
-        # Event handlers for batch processing
-        process_batch_btn.click(
-            fn=process_batch_queries,
-            inputs=[batch_input],
-            outputs=[batch_results]
-        )
-
-        clear_batch_btn.click(
-            fn=lambda: "",
-            outputs=[batch_input]
-        )
+            gr.Markdown(_INSTRUCTIONS_MD)
 
-        # Event handlers for analytics
-        performance_btn.click(
-            fn=get_performance_metrics,
-            outputs=[performance_output]
-        )
-
-        cache_btn.click(
-            fn=get_cache_statistics,
-            outputs=[cache_output]
-        )
+        answer_outputs = [chatbot, answer_output, decision_output, amount_output,
+                          justification_output, evidence_output, json_output]
 
-        clear_cache_btn.click(
-            fn=clear_cache,
-            outputs=[cache_output]
-        )
+        # Event wiring: (trigger, handler, inputs, outputs[, (then_fn, then_outputs)])
+        events = [
+            # Main interface
+            (index_btn.click, upload_and_index, [file_input, ocr_toggle], [status_output, send_btn],
+             (lambda: gr.update(interactive=True), [question_input])),
+            (send_btn.click, ask_question, [question_input, chatbot], answer_outputs,
+             (lambda: gr.update(value=""), [question_input])),
+            (question_input.submit, ask_question, [question_input, chatbot], answer_outputs,
+             (lambda: gr.update(value=""), [question_input])),
+            (reset_btn.click, reset_session, None,
+             [status_output, send_btn, chatbot, answer_output, question_input,
+              decision_output, amount_output, justification_output, evidence_output, json_output,
+              export_user_id, delete_user_id]),
+            # Session info
+            (session_info_btn.click, refresh_session_info, [session_info_digest],
+             [session_info, security_status, session_info_digest]),
+            # Batch processing
+            (process_batch_btn.click, process_batch_queries, [batch_input], [batch_results]),
+            (clear_batch_btn.click, lambda: "", None, [batch_input]),
+            # Analytics
+            (performance_btn.click, refresh_performance_metrics, [performance_digest],
+             [performance_output, performance_digest]),
+            (cache_btn.click, refresh_cache_statistics, [cache_digest], [cache_output, cache_digest]),
+            # Clearing overwrites the stats panel, so the next refresh must always send
+            (clear_cache_btn.click, clear_cache, None, [cache_output], (lambda: None, [cache_digest])),
+            (audit_btn.click, get_audit_trail, [start_date, end_date, decision_filter], [audit_output]),
+            # Configuration
+            (update_keys_btn.click, update_api_keys, [pinecone_key, groq_key, huggingface_key], [keys_status]),
+            (save_config_btn.click, save_model_config, [model_temp, model_max_tokens], [config_status]),
+            (webhook_btn.click, configure_webhook, [webhook_url, webhook_events], [webhook_status]),
+            (rate_limit_btn.click, update_rate_limit, [rate_limit], [rate_limit_status]),
+            # GDPR
+            (export_btn.click, export_user_data, [export_user_id], [export_output]),
+            (delete_btn.click, delete_user_data, [delete_user_id], [delete_status]),
+            # Query tools
+            (save_template_btn.click, save_query_template, [template_name, template_query], [template_status]),
+            (load_template_btn.click, load_query_template, [template_name], [template_query]),
+            (validate_btn.click, get_query_validation, [validation_query], [validation_output]),
+            (history_btn.click, get_query_history, None, [query_history]),
+        ]
 
-        audit_btn.click(
-            fn=get_audit_trail,
-            inputs=[start_date, end_date, decision_filter],
-            outputs=[audit_output]
-        )
-
-        # Event handlers for configuration
-        update_keys_btn.click(
-            fn=update_api_keys,
-            inputs=[pinecone_key, groq_key, huggingface_key],
-            outputs=[keys_status]
-        )
-
-        save_config_btn.click(
-            fn=save_model_config,
-            inputs=[model_temp, model_max_tokens],
-            outputs=[config_status]
-        )
-
-        webhook_btn.click(
-            fn=configure_webhook,
-            inputs=[webhook_url, webhook_events],
-            outputs=[webhook_status]
-        )
-
-        rate_limit_btn.click(
-            fn=update_rate_limit,
-            inputs=[rate_limit],
-            outputs=[rate_limit_status]
-        )
-
-        # Event handlers for GDPR
-        export_btn.click(
-            fn=export_user_data,
-            inputs=[export_user_id],
-            outputs=[export_output]
-        )
-
-        delete_btn.click(
-            fn=delete_user_data,
-            inputs=[delete_user_id],
-            outputs=[delete_status]
-        )
-
-        # Event handlers for query tools
-        save_template_btn.click(
-            fn=save_query_template,
-            inputs=[template_name, template_query],
-            outputs=[template_status]
-        )
-
-        load_template_btn.click(
-            fn=load_query_template,
-            inputs=[template_name],
-            outputs=[template_query]
-        )
-
-        validate_btn.click(
-            fn=get_query_validation,
-            inputs=[validation_query],
-            outputs=[validation_output]
-        )
-
-        history_btn.click(
-            fn=get_query_history,
-            outputs=[query_history]
-        )
+        for trigger, fn, inputs, outputs, *then in events:
+            event = trigger(fn=fn, inputs=inputs, outputs=outputs)
+            if then:
+                then_fn, then_outputs = then[0]
+                event.then(fn=then_fn, outputs=then_outputs)
 
     return interface
@@ -20,6 +20,21 @@ class AppState:
         self.cache_manager = None
         self.security_manager = None
     
+    @property
+    def audit_trail(self):
+        """Audit trail of the QA chain, or None if the chain is not ready"""
+        return getattr(self.qa_chain, 'audit_trail', None)
+    
+    @property
+    def memory(self):
+        """Conversation memory of the QA chain, or None if the chain is not ready"""
+        return getattr(self.qa_chain, 'memory', None)
+    
+    @property
+    def query_processor(self):
+        """Query processor of the QA chain, or None if the chain is not ready"""
+        return getattr(self.qa_chain, 'query_processor', None)
+    
     def initialize(self):
         """Initialize application components"""
         try:
@@ -1,10 +1,16 @@
 import json
 import logging
+import threading
+import time
 import uuid
-from typing import Dict, List, Any, Optional
+from collections import defaultdict
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime, timedelta
 from src.api.setup_api import logger
 
+# Minimum gap between retention sweeps; each sweep walks every stored entry
+_CLEANUP_INTERVAL_SECONDS = 60.0
+
 # -----------------------------
 # Audit Trail System
 # -----------------------------
@@ -17,6 +23,15 @@ class AuditTrail:
         self.decision_history = []
         self.activity_log = []
         
+        # Per-user index over the entries above, so a GDPR delete knows exactly what to remove
+        self._by_user = defaultdict(list)
+        self._decision_history_by_user = defaultdict(list)
+        self._last_cleanup = 0.0
+        
+        # Batch queries log from several threads; sweeps rebind the lists, so appends and sweeps
+        # must not interleave or an append to the old list is lost. Re-entrant for log -> sweep
+        self._lock = threading.RLock()
+        
         # Audit configuration
         self.audit_config = {
             "retention_days": 365,
@@ -63,27 +78,32 @@ class AuditTrail:
                 }
             }
             
-            # Add to audit log
-            self.audit_log.append(audit_entry)
-            
             # Add to decision history - SAFE VERSION
             safe_decision_history_entry = {
                 "audit_id": audit_id,
                 "timestamp": audit_entry["timestamp"],
+                "user_id": user_id,
+                "session_id": session_id,
                 "decision": safe_decision.get("status", "unknown"),
                 "amount": safe_decision.get("amount", "N/A"),
                 "confidence": safe_decision.get("confidence", 0.0),
                 "query_summary": self._create_query_summary(safe_query_context)
             }
-            self.decision_history.append(safe_decision_history_entry)
-            
-            # Add to session trail
-            if session_id not in self.session_trails:
-                self.session_trails[session_id] = []
-            self.session_trails[session_id].append(audit_entry)
             
-            # Cleanup old entries
-            self._cleanup_old_entries()
+            with self._lock:
+                # Add to audit log and decision history
+                self.audit_log.append(audit_entry)
+                self.decision_history.append(safe_decision_history_entry)
+                self._by_user[user_id].extend((audit_entry, safe_decision_history_entry))
+                self._decision_history_by_user[user_id].append(safe_decision_history_entry)
+                
+                # Add to session trail
+                if session_id not in self.session_trails:
+                    self.session_trails[session_id] = []
+                self.session_trails[session_id].append(audit_entry)
+                
+                # Cleanup old entries
+                self._maybe_cleanup()
             
             logger.info(f"Decision logged with audit ID: {audit_id}")
             return audit_id
@@ -117,16 +137,18 @@ class AuditTrail:
                 }
             }
             
-            # Add to activity log
-            self.activity_log.append(activity_entry)
-            
-            # Add to session trail
-            if session_id not in self.session_trails:
-                self.session_trails[session_id] = []
-            self.session_trails[session_id].append(activity_entry)
-            
-            # Cleanup old entries
-            self._cleanup_old_entries()
+            with self._lock:
+                # Add to activity log
+                self.activity_log.append(activity_entry)
+                self._by_user[user_id].append(activity_entry)
+                
+                # Add to session trail
+                if session_id not in self.session_trails:
+                    self.session_trails[session_id] = []
+                self.session_trails[session_id].append(activity_entry)
+                
+                # Cleanup old entries
+                self._maybe_cleanup()
             
             logger.info(f"Activity logged: {action} with audit ID: {audit_id}")
             return audit_id
@@ -163,16 +185,18 @@ class AuditTrail:
                 }
             }
             
-            # Add to activity log
-            self.activity_log.append(error_entry)
-            
-            # Add to session trail
-            if session_id not in self.session_trails:
-                self.session_trails[session_id] = []
-            self.session_trails[session_id].append(error_entry)
-            
-            # Cleanup old entries
-            self._cleanup_old_entries()
+            with self._lock:
+                # Add to activity log
+                self.activity_log.append(error_entry)
+                self._by_user[user_id].append(error_entry)
+                
+                # Add to session trail
+                if session_id not in self.session_trails:
+                    self.session_trails[session_id] = []
+                self.session_trails[session_id].append(error_entry)
+                
+                # Cleanup old entries
+                self._maybe_cleanup()
             
             logger.error(f"Error logged: {error_type} - {error_message} with audit ID: {audit_id}")
             return audit_id
@@ -188,10 +212,21 @@ class AuditTrail:
                         end_date: datetime = None,
                         action_type: str = None) -> List[Dict[str, Any]]:
         """Retrieve audit trail with filtering options"""
+        return list(self.iter_audit_trail(session_id=session_id, user_id=user_id, start_date=start_date,
+                                          end_date=end_date, action_type=action_type))
+    
+    def iter_audit_trail(self, 
+                         session_id: str = None,
+                         user_id: str = None,
+                         start_date: datetime = None,
+                         end_date: datetime = None,
+                         action_type: str = None) -> Iterator[Dict[str, Any]]:
+        """Yield filtered audit entries one at a time, for streaming large trails"""
         try:
-            filtered_trail = []
+            # Reads trigger the sweep too, so expired entries are not served when nothing is being logged
+            self._maybe_cleanup()
             
-            # Determine which log to search
+            # Determine which log to search; cleanup rebinds the list, so this reference stays stable
             search_log = self.audit_log
             
             for entry in search_log:
@@ -249,18 +284,15 @@ class AuditTrail:
                             # If timestamp parsing fails, skip this entry
                             continue
                     
-                    filtered_trail.append(safe_entry)
-                    
                 except Exception as e:
                     # If processing an entry fails, skip it and continue
                     logger.error(f"Error processing audit entry: {e}")
                     continue
-            
-            return filtered_trail
+                
+                yield safe_entry
             
         except Exception as e:
             logger.error(f"Failed to retrieve audit trail: {e}")
-            return []
     
     def get_decision_history(self, 
                            session_id: str = None,
@@ -268,9 +300,14 @@ class AuditTrail:
                            limit: int = 100) -> List[Dict[str, Any]]:
         """Retrieve decision history with filtering"""
         try:
+            self._maybe_cleanup()
+            
             filtered_history = []
             
-            for decision in self.decision_history:
+            # Use the per-user index when filtering by user
+            search_history = self._decision_history_by_user.get(user_id, []) if user_id else self.decision_history
+            
+            for decision in search_history:
                 try:
                     # Create a safe copy of the decision to prevent recursion
                     safe_decision = {}
@@ -328,6 +365,8 @@ class AuditTrail:
     def get_session_summary(self, session_id: str) -> Dict[str, Any]:
         """Get comprehensive summary of a session"""
         try:
+            self._maybe_cleanup()
+            
             if session_id not in self.session_trails:
                 return {"error": "Session not found"}
             
@@ -370,6 +409,37 @@ class AuditTrail:
             logger.error(f"Failed to get session summary: {e}")
             return {"error": str(e)}
     
+    def delete_user_data(self, user_id: str) -> int:
+        """Delete all entries recorded for a user and return how many were removed"""
+        try:
+            with self._lock:
+                entries = self._by_user.pop(user_id, [])
+                self._decision_history_by_user.pop(user_id, None)
+                if not entries:
+                    return 0
+                
+                # Erase immediately: compact the user's entries out of every flat list now
+                # rather than waiting for the retention sweep
+                doomed = {id(entry) for entry in entries}
+                self.audit_log = [entry for entry in self.audit_log if id(entry) not in doomed]
+                self.decision_history = [entry for entry in self.decision_history if id(entry) not in doomed]
+                self.activity_log = [entry for entry in self.activity_log if id(entry) not in doomed]
+                
+                # Only the sessions the user's entries belong to need rewriting
+                for session_id in {entry.get("session_id") for entry in entries}:
+                    trail = [entry for entry in self.session_trails.get(session_id, []) if id(entry) not in doomed]
+                    if trail:
+                        self.session_trails[session_id] = trail
+                    else:
+                        self.session_trails.pop(session_id, None)
+            
+            logger.info(f"Deleted {len(entries)} audit entries for user: {user_id}")
+            return len(entries)
+            
+        except Exception as e:
+            logger.error(f"Failed to delete user data: {e}")
+            return 0
+    
     def export_audit_report(self, 
                            start_date: datetime = None,
                            end_date: datetime = None,
@@ -480,40 +550,54 @@ class AuditTrail:
         # In a real implementation, this would track actual processing time
         return 0.5  # Placeholder value
     
+    def _maybe_cleanup(self):
+        """Run the retention sweep at most once per interval instead of on every log call"""
+        with self._lock:
+            # The size cap is O(1) to check, so it holds on every call rather than once per interval
+            max_size = self.audit_config["max_log_size"]
+            if len(self.audit_log) > max_size:
+                self.audit_log = self.audit_log[-max_size:]
+        
+            now = time.monotonic()
+            if now - self._last_cleanup >= _CLEANUP_INTERVAL_SECONDS:
+                self._last_cleanup = now
+                self._cleanup_old_entries()
+    
     def _cleanup_old_entries(self):
         """Remove old audit entries based on retention policy"""
         try:
             cutoff_date = datetime.now() - timedelta(days=self.audit_config["retention_days"])
             
+            def is_retained(entry):
+                return datetime.fromisoformat(entry["timestamp"]) > cutoff_date
+            
             # Cleanup audit log
-            self.audit_log = [
-                entry for entry in self.audit_log
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_date
-            ]
+            self.audit_log = [entry for entry in self.audit_log if is_retained(entry)]
             
             # Cleanup decision history
-            self.decision_history = [
-                entry for entry in self.decision_history
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_date
-            ]
+            self.decision_history = [entry for entry in self.decision_history if is_retained(entry)]
             
             # Cleanup activity log
-            self.activity_log = [
-                entry for entry in self.activity_log
-                if datetime.fromisoformat(entry["timestamp"]) > cutoff_date
-            ]
+            self.activity_log = [entry for entry in self.activity_log if is_retained(entry)]
             
             # Cleanup session trails
             for session_id in list(self.session_trails.keys()):
                 self.session_trails[session_id] = [
                     entry for entry in self.session_trails[session_id]
-                    if datetime.fromisoformat(entry["timestamp"]) > cutoff_date
+                    if is_retained(entry)
                 ]
                 
                 # Remove empty sessions
                 if not self.session_trails[session_id]:
                     del self.session_trails[session_id]
             
+            # Cleanup per-user indexes
+            for index in (self._by_user, self._decision_history_by_user):
+                for user_id in list(index.keys()):
+                    index[user_id] = [entry for entry in index[user_id] if is_retained(entry)]
+                    if not index[user_id]:
+                        del index[user_id]
+            
             # Limit log size
             if len(self.audit_log) > self.audit_config["max_log_size"]:
                 self.audit_log = self.audit_log[-self.audit_config["max_log_size"]:]
@@ -1,5 +1,6 @@
+import threading
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterable, List, Tuple
 
 # -----------------------------
 # Conversation Memory
@@ -9,23 +10,47 @@ class ConversationMemory:
     
     def __init__(self):
         self.conversations = {}
+        self._versions = {}
+        # Guards history appends and version bumps; queries may run on several threads
+        self._lock = threading.Lock()
     
     def add_message(self, session_id: str, role: str, content: str):
         """Add a message to conversation history"""
-        if session_id not in self.conversations:
-            self.conversations[session_id] = []
-        
-        self.conversations[session_id].append({
-            'role': role,
-            'content': content,
-            'timestamp': datetime.now().isoformat()
-        })
+        with self._lock:
+            if session_id not in self.conversations:
+                self.conversations[session_id] = []
+            
+            self.conversations[session_id].append({
+                'role': role,
+                'content': content,
+                'timestamp': datetime.now().isoformat()
+            })
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+    
+    def append_and_get(self, session_id: str, messages: Iterable[Tuple[str, str]]) -> List[Dict]:
+        """Add (role, content) messages and return the updated history in one call"""
+        timestamp = datetime.now().isoformat()
+        entries = [
+            {'role': role, 'content': content, 'timestamp': timestamp}
+            for role, content in messages
+        ]
+        with self._lock:
+            history = self.conversations.setdefault(session_id, [])
+            history.extend(entries)
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+        return history
     
     def get_history(self, session_id: str) -> List[Dict]:
         """Get conversation history for session"""
         return self.conversations.get(session_id, [])
     
+    def get_version(self, session_id: str) -> int:
+        """Get a counter that changes whenever the session history changes"""
+        return self._versions.get(session_id, 0)
+    
     def clear_session(self, session_id: str):
         """Clear conversation history for session"""
-        if session_id in self.conversations:
-            del self.conversations[session_id]
+        with self._lock:
+            if session_id in self.conversations:
+                del self.conversations[session_id]
+                self._versions[session_id] = self._versions.get(session_id, 0) + 1
@@ -11,5 +11,10 @@ __all__ = [
     "test_file_processing",
     "test_hackathon_demo",
     "test_structured_response",
-    "test_webhook"
+    "test_webhook",
+    "test_conv_mem",
+    "test_security_manager",
+    "test_audit_trail",
+    "test_response_cache",
+    "test_api_security"
 ]
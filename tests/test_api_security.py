@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for webhook signatures and API rate limiting
+"""
+
+import hashlib
+import hmac
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import orjson
+
+from src.api import endpoints
+from src.api.endpoints import APIEndpoints
+from src.utils.cache_manager import CacheManager
+from src.utils.security_manager import SecurityManager
+
+def create_api_endpoints() -> APIEndpoints:
+    """APIEndpoints built through its constructor, without webhook workers or the on-disk webhook config"""
+    with patch.object(APIEndpoints, "_load_webhook_config"), \
+         patch.object(APIEndpoints, "_watch_webhook_config"), \
+         patch.object(APIEndpoints, "_webhook_worker"):
+        return APIEndpoints(MagicMock(), CacheManager(), SecurityManager())
+
+def test_webhook_signature():
+    """Every delivery is the exact signed body, including payloads with non-string keys"""
+    print("🧪 Testing Webhook Signatures")
+    print("=" * 50)
+
+    api = create_api_endpoints()
+    api.webhook_endpoints = {
+        "hook_a": {"url": "http://a", "events": ["decision_made"], "secret": "s3cret", "active": True},
+        "hook_b": {"url": "http://b", "events": ["decision_made"], "secret": "s3cret", "active": True},
+        "hook_c": {"url": "http://c", "events": ["decision_made"], "secret": "other", "active": True},
+        "hook_d": {"url": "http://d", "events": ["decision_made"], "active": True},
+    }
+    data = {
+        "query": "46M, knee surgery in Pune — ₹ coverage?",
+        "decision": {"status": "Approved", "amount": "₹10,000", "confidence": 0.91},
+        "clauses": [{"z": 1, "a": [1, 2, {"y": None}]}],
+        "chain_scores": {1: 0.8, 2: 0.6},
+        "processing_time": 1.5
+    }
+
+    print("1. Delivering one event to four webhooks...")
+    api._webhook_session = MagicMock()
+    api._webhook_session.post.return_value.status_code = 200
+    threading.Thread(target=api._webhook_worker, daemon=True).start()
+    api._trigger_webhooks("decision_made", data)
+    api.wait_for_webhooks()
+    delivered = {call.args[0]: call.kwargs for call in api._webhook_session.post.call_args_list}
+    assert set(delivered) == {"http://a", "http://b", "http://c", "http://d"}
+    print("   ✅ All webhooks delivered")
+
+    print("2. Checking each body and signature...")
+    for url, secret in (("http://a", "s3cret"), ("http://b", "s3cret"), ("http://c", "other")):
+        body, headers = delivered[url]["data"], delivered[url]["headers"]
+        assert headers["Content-Type"] == "application/json"
+        expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        assert headers["X-Webhook-Signature"] == expected, url
+        payload = orjson.loads(body)
+        assert payload["data"]["chain_scores"] == {"1": 0.8, "2": 0.6}
+        assert body == orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        print(f"   ✅ {url} signature verified over the raw body")
+    assert "X-Webhook-Signature" not in delivered["http://d"]["headers"]
+    print("   ✅ Unsigned webhook carries no signature")
+
+    print("3. Checking the direct (non-spliced) signing path...")
+    payload = orjson.loads(delivered["http://a"]["data"])
+    payload["data"] = data
+    assert api._generate_webhook_signature(payload, "s3cret") == delivered["http://a"]["headers"]["X-Webhook-Signature"]
+    print("   ✅ Direct and spliced signatures agree")
+
+    print("\n🎉 Webhook signature testing completed!")
+
+def test_rate_limit():
+    """Token buckets allow a burst of max_requests_per_minute, refill over time and are evicted least recently seen first"""
+    print("🧪 Testing Rate Limiting")
+    print("=" * 50)
+
+    api = create_api_endpoints()
+    api.api_config["max_requests_per_minute"] = 3
+    client = SimpleNamespace(remote_addr="10.0.0.1")
+
+    print("1. Spending the burst...")
+    assert all(api._check_rate_limit(client) for _ in range(3))
+    assert not api._check_rate_limit(client)
+    print("   ✅ Fourth request in the minute rejected")
+
+    print("2. Checking clients are independent...")
+    assert api._check_rate_limit(SimpleNamespace(remote_addr="10.0.0.2"))
+    print("   ✅ Other client unaffected")
+
+    print("3. Checking refill...")
+    api._rate_buckets["10.0.0.1"][1] -= 20  # 20s at 3 tokens/minute refills one token
+    assert api._check_rate_limit(client)
+    assert not api._check_rate_limit(client)
+    print("   ✅ One token refilled after 20s")
+
+    print("4. Checking eviction at the client cap...")
+    with patch.object(endpoints, "_RATE_LIMIT_MAX_CLIENTS", 3):
+        api._check_rate_limit(SimpleNamespace(remote_addr="10.0.0.3"))
+        api._check_rate_limit(client)  # 10.0.0.2 is now the least recently seen
+        api._check_rate_limit(SimpleNamespace(remote_addr="10.0.0.4"))
+    assert list(api._rate_buckets) == ["10.0.0.3", "10.0.0.1", "10.0.0.4"]
+    assert not api._check_rate_limit(client)
+    print("   ✅ Least recently seen client dropped, active client keeps its bucket")
+
+    print("\n🎉 Rate limit testing completed!")
+
+if __name__ == "__main__":
+    test_webhook_signature()
+    test_rate_limit()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test script for GDPR erasure in the audit trail
+"""
+
+# src.api loads first, as in app.py: the src.api, src.core and src.utils packages import each other
+import src.api  # noqa: F401
+from src.utils.audit_trail import AuditTrail
+
+def test_gdpr_erasure():
+    """delete_user_data removes a user's entries from every log immediately"""
+    print("🧪 Testing GDPR Audit Erasure")
+    print("=" * 50)
+
+    audit_trail = AuditTrail()
+    for user_id in ("alice", "bob", "alice"):
+        audit_trail.log_decision("shared", user_id, "query", {"status": "approved"}, {}, {})
+        audit_trail.log_activity(f"{user_id}_session", user_id, "query_started")
+    audit_trail.log_error("alice_session", "alice", "retrieval_error", "boom")
+
+    removed = audit_trail.delete_user_data("alice")
+    assert removed == 7  # 2 decisions (audit + history entry each), 2 activities, 1 error
+
+    for log in (audit_trail.audit_log, audit_trail.decision_history, audit_trail.activity_log):
+        assert all(entry["user_id"] != "alice" for entry in log)
+    assert len(audit_trail.decision_history) == 1 and len(audit_trail.activity_log) == 1
+    assert "alice_session" not in audit_trail.session_trails
+    assert all(entry["user_id"] == "bob" for entry in audit_trail.session_trails["shared"])
+    assert all(entry["user_id"] == "bob" for entry in audit_trail.get_audit_trail())
+    assert audit_trail.get_decision_history(user_id="alice") == []
+    print("   ✅ No trace of the deleted user in any log or reader")
+
+    print("\n🎉 GDPR erasure testing completed!")
+
+if __name__ == "__main__":
+    test_gdpr_erasure()
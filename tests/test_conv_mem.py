@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Test script for conversation memory versions
+"""
+
+# src.api loads first, as in app.py: the src.api, src.core and src.utils packages import each other
+import src.api  # noqa: F401
+from src.utils.conv_mem import ConversationMemory
+
+def test_conversation_versions():
+    """The history version changes on every add and clear, which keys the interface's history cache"""
+    print("🧪 Testing Conversation Versions")
+    print("=" * 50)
+
+    memory = ConversationMemory()
+    assert memory.get_version("s1") == 0
+
+    print("1. Adding messages...")
+    memory.add_message("s1", "human", "hello")
+    after_first = memory.get_version("s1")
+    memory.add_message("s1", "assistant", "hi")
+    after_second = memory.get_version("s1")
+    assert 0 < after_first < after_second
+    assert [m["content"] for m in memory.get_history("s1")] == ["hello", "hi"]
+    print("   ✅ Version bumps on every add")
+
+    print("2. Reading without changes...")
+    memory.get_history("s1")
+    assert memory.get_version("s1") == after_second
+    assert memory.get_version("s2") == 0
+    print("   ✅ Reads and other sessions leave the version alone")
+
+    print("3. Clearing the session...")
+    memory.clear_session("s1")
+    assert memory.get_version("s1") > after_second
+    assert memory.get_history("s1") == []
+    print("   ✅ Version bumps on clear")
+
+    print("\n🎉 Conversation version testing completed!")
+
+if __name__ == "__main__":
+    test_conversation_versions()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the QA chain response cache
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+
+# src.api loads first, as in app.py: the src.api, src.core and src.utils packages import each other
+import src.api  # noqa: F401
+from src.core.qa_chain import QAChain
+
+def _qa_chain() -> QAChain:
+    """QAChain built through its constructor, with the LLM and spaCy models stubbed out"""
+    with patch("src.core.qa_chain.ChatGroq"), patch("src.core.qa_chain.EnhancedQueryProcessor"):
+        return QAChain({"GROQ_API_KEY": "test-key", "LLM_MODEL": "test-model"})
+
+def _unit(*values) -> np.ndarray:
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def _response(question: str, decision: str):
+    structured = {
+        "question": question,
+        "query": {"original": question, "parsed": {}},
+        "query_analysis": {"parsed_entities": {}},
+        "decision": {"status": decision, "confidence": 0.9}
+    }
+    return {
+        "answer": f"{decision}.",
+        "decision": decision,
+        "amount": None,
+        "structured_response": structured,
+        "json_output": structured,
+        "reasoning_result": {},
+        "consistency_validation": {}
+    }
+
+def test_response_cache():
+    """Semantic hits require matching entities, and cached responses are private copies"""
+    print("🧪 Testing Response Cache")
+    print("=" * 50)
+
+    qa_chain = _qa_chain()
+    entities = (("age", "46"), ("procedure", "Knee Surgery"))
+    response = _response("knee surgery for 46M?", "Approved")
+    qa_chain._store_cached_response("s1", "knee surgery for 46M?", entities, _unit(1, 0, 0), response)
+
+    print("1. Exact repeat...")
+    assert qa_chain._get_cached_response("s1", "knee surgery for 46M?") == response
+    assert qa_chain._get_cached_response("s2", "knee surgery for 46M?") is None
+    print("   ✅ Exact hit is scoped to its session")
+
+    print("2. Near-duplicate with the same entities...")
+    assert qa_chain._get_semantic_response("s1", entities, _unit(1, 0.1, 0)) == response
+    print("   ✅ Semantic hit")
+
+    print("3. Near-duplicate with different entities...")
+    other_entities = (("age", "70"), ("procedure", "Knee Surgery"))
+    assert qa_chain._get_semantic_response("s1", other_entities, _unit(1, 0.1, 0)) is None
+    assert qa_chain._get_semantic_response("s1", entities, _unit(0, 1, 0)) is None
+    print("   ✅ Entity mismatch and dissimilar questions miss")
+
+    print("4. Caller mutation after store...")
+    response["structured_response"]["decision"]["status"] = "Rejected"
+    cached = qa_chain._get_cached_response("s1", "knee surgery for 46M?")
+    assert cached["structured_response"]["decision"]["status"] == "Approved"
+    print("   ✅ Cached response unaffected")
+
+    print("\n🎉 Response cache testing completed!")
+
+def test_semantic_replay():
+    """A replayed near-duplicate describes the new question and leaves the cached entry untouched"""
+    print("🧪 Testing Semantic Replay")
+    print("=" * 50)
+
+    qa_chain = _qa_chain()
+    entities = (("age", "46"), ("procedure", "Knee Surgery"))
+    qa_chain._store_cached_response("s1", "knee surgery for 46M?", entities, _unit(1, 0, 0),
+                                    _response("knee surgery for 46M?", "Approved"))
+
+    print("1. Replaying for a reworded question...")
+    question = "46 year old man, knee surgery - covered?"
+    query_analysis = {"parsed_entities": {"age": "46", "procedure": "Knee Surgery"}}
+    cached = qa_chain._get_semantic_response("s1", entities, _unit(1, 0.1, 0))
+    replayed = qa_chain._replay_cached_response(cached, question, query_analysis, "s1", "alice")
+
+    structured = replayed["structured_response"]
+    assert structured["question"] == question
+    assert structured["query"]["original"] == question
+    assert structured["query_analysis"]["parsed_entities"] == query_analysis["parsed_entities"]
+    assert replayed["json_output"] is structured
+    assert structured["decision"]["status"] == "Approved"
+    print("   ✅ Question-dependent fields rebuilt, decision kept")
+
+    print("2. Checking the cached entry...")
+    again = qa_chain._get_semantic_response("s1", entities, _unit(1, 0.1, 0))
+    assert again["structured_response"]["question"] == "knee surgery for 46M?"
+    print("   ✅ Cached entry unchanged")
+
+    print("3. Checking the turn was recorded...")
+    assert replayed["history"][-1]["content"] == "Approved."
+    assert qa_chain.audit_trail.get_decision_history(user_id="alice")
+    print("   ✅ Memory and audit trail updated")
+
+    print("\n🎉 Semantic replay testing completed!")
+
+if __name__ == "__main__":
+    test_response_cache()
+    test_semantic_replay()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for password hashing migration and the security audit log
+"""
+
+import hashlib
+import secrets
+
+# src.api loads first, as in app.py: the src.api, src.core and src.utils packages import each other
+import src.api  # noqa: F401
+from src.utils.security_manager import SecurityManager
+
+def _legacy_pbkdf2_hash(password: str) -> str:
+    """Hash in the pre-Argon2 salt:hex PBKDF2 format still found in stored credentials"""
+    salt = secrets.token_hex(16)
+    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
+    return f"{salt}:{password_hash.hex()}"
+
+def test_legacy_password_migration():
+    """A legacy PBKDF2 hash still verifies, is flagged for rehash, and its Argon2 replacement verifies"""
+    print("🧪 Testing Password Hash Migration")
+    print("=" * 50)
+
+    security_manager = SecurityManager()
+    legacy_hash = _legacy_pbkdf2_hash("correct horse")
+
+    print("1. Verifying a legacy PBKDF2 hash...")
+    assert security_manager.verify_password("correct horse", legacy_hash)
+    assert not security_manager.verify_password("wrong horse", legacy_hash)
+    print("   ✅ Legacy hash verifies the right password only")
+
+    print("2. Checking the legacy hash is flagged for rehash...")
+    assert security_manager.needs_rehash(legacy_hash)
+    print("   ✅ Legacy hash needs rehash")
+
+    print("3. Rehashing with Argon2id...")
+    new_hash = security_manager.hash_password("correct horse")
+    assert new_hash.startswith("$argon2")
+    assert security_manager.verify_password("correct horse", new_hash)
+    assert not security_manager.verify_password("wrong horse", new_hash)
+    assert not security_manager.needs_rehash(new_hash)
+    print("   ✅ Argon2id hash verifies and is current")
+
+    print("4. Rejecting malformed hashes...")
+    assert not security_manager.verify_password("correct horse", "salt:not-hex")
+    assert not security_manager.verify_password("correct horse", "")
+    print("   ✅ Malformed hashes fail closed")
+
+    print("\n🎉 Password migration testing completed!")
+
+def test_security_audit_log_isolation():
+    """Callers of the memoized audit log query must not see each other's mutations"""
+    print("🧪 Testing Security Audit Log Isolation")
+    print("=" * 50)
+
+    security_manager = SecurityManager()
+    security_manager._log_security_event("login", "alice", {"ip_address": "10.0.0.1"})
+
+    first = security_manager.get_security_audit_log(user_id="alice")
+    assert first and first[0]["details"]["ip_address"] == "10.0.0.1"
+    first[0]["details"]["ip_address"] = "[REDACTED]"
+    first[0]["event_type"] = "mutated"
+
+    second = security_manager.get_security_audit_log(user_id="alice")
+    assert second[0]["details"]["ip_address"] == "10.0.0.1"
+    assert second[0]["event_type"] == "login"
+    print("   ✅ Cached entries unaffected by caller mutation")
+
+    print("\n🎉 Audit log isolation testing completed!")
+
+if __name__ == "__main__":
+    test_legacy_password_migration()
+    test_security_audit_log_isolation()
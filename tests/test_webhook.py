@@ -64,6 +64,9 @@ def test_webhook():
     api._trigger_webhooks("error_occurred", error_data)
     print("   ✅ Error webhook triggered")
     
+    # Deliveries run on background workers; wait for them before the script exits
+    api.wait_for_webhooks()
+    
     print("\n🎉 Webhook testing completed!")
     print("Check your webhook endpoint (webhook.site) for incoming requests")
 